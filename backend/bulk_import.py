@@ -0,0 +1,251 @@
+"""Bulk import of historical logbook entries
+
+Usage (from the backend directory):
+
+    python bulk_import.py entries.ndjson [--refine]
+    python bulk_import.py notebooks.tar.gz
+
+NDJSON input has one entry per line: {"author", "title", "content", "date"
+(YYYY-MM-DD, default today), "tags"}. With --refine, "content" is treated as
+a rough description and refined by the configured LLM first. Tarballs hold
+finished markdown entries, which are written verbatim under their author's
+directory (taken from the frontmatter, else the member's parent directory).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tarfile
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable, IO, Callable
+
+import yaml
+
+from logbook_parser import LogbookParser, author_dir_name
+from user_manager import UserManager
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Errors listed in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# (source, record, error): source is "line N" or a tar member name; exactly one of record/error is set
+Item = Tuple[str, Optional[Dict[str, Any]], Optional[str]]
+
+def _safe_dir_name(author: str) -> Optional[str]:
+    name = author_dir_name(author)
+    if not name or name in ('.', '..') or '/' in name or os.sep in name:
+        return None
+    return name
+
+def read_ndjson(stream: IO[bytes]) -> Iterator[Item]:
+    """Validated entry records from NDJSON, one per non-blank line"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    # Decoded per line, so one bad byte costs only its own record
+    for number, raw in enumerate(stream, start=1):
+        source = f"line {number}"
+        try:
+            line = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            yield source, None, "Invalid UTF-8"
+            continue
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield source, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield source, None, "Expected a JSON object"
+            continue
+        author, title, content = data.get('author'), data.get('title'), data.get('content')
+        if not all(isinstance(value, str) and value.strip() for value in (author, title, content)):
+            yield source, None, "author, title and content must be non-empty strings"
+            continue
+        if _safe_dir_name(author.strip()) is None:
+            yield source, None, f"Invalid author name: {author!r}"
+            continue
+        date = data.get('date') or today
+        if not isinstance(date, str) or not DATE_PATTERN.match(date):
+            yield source, None, f"Invalid date (expected YYYY-MM-DD): {date!r}"
+            continue
+        tags = data.get('tags') or []
+        if isinstance(tags, str):
+            tags = [tags]
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            yield source, None, "tags must be a string or a list of strings"
+            continue
+        yield source, {
+            "author": author.strip(),
+            "title": title.strip(),
+            "date": date,
+            "tags": tags,
+            "content": content
+        }, None
+
+def read_tarball(fileobj: IO[bytes]) -> Iterator[Item]:
+    """Markdown members of a (possibly compressed) tar archive, as verbatim entries"""
+    with tarfile.open(fileobj=fileobj, mode='r:*') as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.endswith('.md'):
+                continue
+            source = member.name
+            try:
+                text = archive.extractfile(member).read().decode('utf-8')
+            except UnicodeDecodeError as e:
+                yield source, None, f"Not UTF-8: {e}"
+                continue
+            author = None
+            if text.startswith('---'):
+                parts = text.split('---', 2)
+                if len(parts) >= 3:
+                    try:
+                        frontmatter = yaml.safe_load(parts[1]) or {}
+                    except yaml.YAMLError:
+                        frontmatter = {}
+                    if isinstance(frontmatter, dict) and frontmatter.get('author'):
+                        author = str(frontmatter['author']).strip()
+            if author is None:
+                # Same fallback the parser uses: the directory names the author
+                parent = os.path.basename(os.path.dirname(member.name))
+                author = parent.replace('_', ' ').title() if parent else None
+            if not author or _safe_dir_name(author) is None:
+                yield source, None, "No usable author in frontmatter or directory name"
+                continue
+            yield source, {"author": author, "file_name": os.path.basename(member.name), "markdown": text}, None
+
+class BulkImporter:
+    """Writes imported entries in fsync batches and registers their authors once
+
+    Records stream through: refinement (optional, batched through the agent)
+    and writing happen as records arrive, so memory stays bounded for large
+    imports. The corpus and its indexes are refreshed once when writing
+    finishes, and new authors are added to the user registry in one write.
+    """
+
+    def __init__(
+        self,
+        parser: LogbookParser,
+        user_manager: UserManager,
+        get_agent: Optional[Callable[[], Any]] = None,
+        refine_batch_size: int = 4,
+        write_batch_size: int = 256
+    ):
+        self.parser = parser
+        self.user_manager = user_manager
+        self.get_agent = get_agent
+        self.refine_batch_size = refine_batch_size
+        self.write_batch_size = write_batch_size
+
+    def import_items(self, items: Iterable[Item], refine: bool = False) -> Dict[str, Any]:
+        """Import records and return a report of what was written and what failed"""
+        if refine and self.get_agent is None:
+            raise ValueError("Refinement requested but no agent is configured")
+        errors: List[Dict[str, str]] = []
+        error_count = 0
+        # Resolved on the first refine batch and reused for the rest of the import
+        agent = None
+        # Target path -> (source, author) of the record written there
+        targets: Dict[str, Tuple[str, str]] = {}
+
+        def fail(source: str, error: str):
+            nonlocal error_count
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"source": source, "error": error})
+
+        def refined(records: List[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+            nonlocal agent
+            drafts = [
+                {"author": r['author'], "title": r['title'], "rough_description": r['content'], "tags": r['tags']}
+                for _, r in records
+            ]
+            try:
+                if agent is None:
+                    agent = self.get_agent()
+                outcomes = agent.refine_batch(drafts)
+            except Exception as e:
+                outcomes = [e] * len(drafts)
+            for (source, record), outcome in zip(records, outcomes):
+                if isinstance(outcome, Exception):
+                    fail(source, f"Refinement failed: {outcome}")
+                else:
+                    yield source, {**record, "content": outcome}
+
+        def records() -> Iterator[Tuple[str, Dict[str, Any]]]:
+            pending: List[Tuple[str, Dict[str, Any]]] = []
+            for source, record, error in items:
+                if error is not None:
+                    fail(source, error)
+                elif refine and 'markdown' not in record:
+                    pending.append((source, record))
+                    if len(pending) >= self.refine_batch_size:
+                        yield from refined(pending)
+                        pending = []
+                else:
+                    yield source, record
+            if pending:
+                yield from refined(pending)
+
+        def files() -> Iterator[Tuple[str, str]]:
+            for source, record in records():
+                author = record['author']
+                if 'markdown' in record:
+                    file_path = os.path.join(self.parser.logbook_dir, author_dir_name(author), record['file_name'])
+                    text = record['markdown']
+                else:
+                    file_path = self.parser.entry_path(author, record['title'], record['date'])
+                    text = self.parser.render_entry(author, record['date'], record['title'], record['content'], record['tags'])
+                # Same author, date and title (or tar file name) as an existing or earlier record: add a -2, -3 suffix
+                file_path = self.parser.unique_path(file_path, targets)
+                targets[file_path] = (source, author)
+                yield file_path, text
+
+        written = self.parser.write_entries(
+            files(),
+            batch_size=self.write_batch_size,
+            on_error=lambda file_path, error: fail(targets[file_path][0], error)
+        )
+        authors: Dict[str, str] = {}
+        for file_path in written:
+            author = targets[file_path][1]
+            authors.setdefault(author.casefold(), author)
+        users_added = self.user_manager.add_users(sorted(authors.values())) if authors else []
+        return {
+            "imported": len(written),
+            "failed": error_count,
+            "users_added": users_added,
+            "errors": errors
+        }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("path", help="NDJSON file (.ndjson/.jsonl) or tar archive of markdown entries")
+    ap.add_argument("--format", choices=["ndjson", "tar"], help="input format (default: from the file extension)")
+    ap.add_argument("--refine", action="store_true", help="refine NDJSON content with the configured LLM")
+    ap.add_argument("--logbook-dir", default="logbooks")
+    args = ap.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "tar")
+
+    agent = None
+
+    def get_agent():
+        # Only load the LLM stack when refinement actually runs, and build it once
+        nonlocal agent
+        if agent is None:
+            from langchain_agent import ScientificLogbookAgent
+            agent = ScientificLogbookAgent()
+        return agent
+
+    importer = BulkImporter(LogbookParser(args.logbook_dir), UserManager(), get_agent)
+    with open(args.path, 'rb') as f:
+        items = read_ndjson(f) if fmt == "ndjson" else read_tarball(f)
+        report = importer.import_items(items, refine=args.refine)
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
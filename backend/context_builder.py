@@ -0,0 +1,141 @@
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+from search_index import tokenize
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character heuristic
+    tiktoken = None
+
+# Tokens of retrieved logbook text allowed per prompt, by backend and use.
+# gpt-4o-mini has a large window, so the limit there is about cost; the local
+# Gemma model is usually served with a small context by LM Studio.
+CONTEXT_BUDGETS = {
+    "openai": {"summary": 6000, "tool": 2000},
+    "local": {"summary": 1500, "tool": 600},
+}
+
+# Sections smaller than this are not worth truncating into the last bit of budget
+MIN_SECTION_TOKENS = 32
+
+class TokenCounter:
+    """Counts tokens with tiktoken when its encoding is available, else ~4 characters per token
+
+    Counts are memoized per string, so re-packing the same entries (the
+    common case: the corpus changes slowly) costs dictionary lookups.
+    """
+
+    def __init__(self, encoding_name: str = "o200k_base", cache_size: int = 16384):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _get_encoding(self):
+        # Loaded once on first use; tiktoken may need to download the encoding, which can fail offline
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if tiktoken is not None:
+                        try:
+                            self._encoding = tiktoken.get_encoding(self.encoding_name)
+                        except Exception as e:
+                            print(f"tiktoken encoding {self.encoding_name} unavailable, estimating tokens: {e}")
+                    self._loaded = True
+        return self._encoding
+
+    def _count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text within max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+        return text[:max_tokens * 4]
+
+def entry_sections(entry: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(section, text) units of an entry; entries without recognised sections are one Content unit"""
+    sections = []
+    for experiment in entry.get('experiments', []) or []:
+        sections.append(("Experiment", experiment['description']))
+    for result in entry.get('results', []) or []:
+        sections.append(("Results", result['description']))
+    for observation in entry.get('observations', []) or []:
+        sections.append(("Observations", observation))
+    if not sections:
+        sections.append(("Content", entry.get('content', '')))
+    return sections
+
+def entry_header(entry: Dict[str, Any]) -> str:
+    return f"**{entry['title']}** by {entry['author']} ({entry['date']})"
+
+class ContextBuilder:
+    """Packs the most relevant entries and sections into a token budget
+
+    Candidates arrive ranked (e.g. by BM25, or by recency for summaries).
+    Every section of every candidate becomes a unit scored by its entry's
+    score and, given a query, its own term overlap with the query. Units are
+    taken best first while they fit; an entry's header is charged once, with
+    its first unit. When the next unit does not fit, it is truncated into
+    the remaining budget and packing stops.
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None, budgets: Optional[Dict[str, Dict[str, int]]] = None):
+        self.counter = counter or TokenCounter()
+        self.budgets = budgets or CONTEXT_BUDGETS
+        # Backend whose budgets apply; kept current by the agent's switch_model()
+        self.backend = "openai"
+
+    def budget(self, purpose: str) -> int:
+        return self.budgets.get(self.backend, self.budgets["openai"])[purpose]
+
+    def pack(
+        self,
+        ranked: List[Tuple[float, Dict[str, Any]]],
+        budget: int,
+        query: Optional[str] = None
+    ) -> List[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+        """Select (entry, [(section, text)]) pairs within budget, in candidate order"""
+        query_terms = set(tokenize(query)) if query else set()
+        units = []
+        for rank, (score, entry) in enumerate(ranked):
+            for position, (section, text) in enumerate(entry_sections(entry)):
+                if not text:
+                    continue
+                relevance = score
+                if query_terms:
+                    overlap = len(query_terms.intersection(tokenize(text)))
+                    relevance *= 1 + overlap / len(query_terms)
+                # Ties keep candidate order, then section order
+                units.append((-relevance, rank, position, section, text))
+        units.sort(key=lambda unit: unit[:3])
+
+        chosen: Dict[int, List[Tuple[int, str, str]]] = {}
+        remaining = budget
+        for _, rank, position, section, text in units:
+            entry = ranked[rank][1]
+            overhead = 0 if rank in chosen else self.counter.count(entry_header(entry)) + 1
+            cost = overhead + self.counter.count(text) + 1
+            if cost <= remaining:
+                chosen.setdefault(rank, []).append((position, section, text))
+                remaining -= cost
+                continue
+            room = remaining - overhead - 1
+            if room >= MIN_SECTION_TOKENS:
+                chosen.setdefault(rank, []).append((position, section, self.counter.truncate(text, room) + "..."))
+            break
+
+        return [
+            (ranked[rank][1], [(section, text) for _, section, text in sorted(chosen[rank])])
+            for rank in sorted(chosen)
+        ]
@@ -0,0 +1,61 @@
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Iterator
+
+from entry_index import EntryIndex, author_key
+
+class CorpusSnapshot:
+    """An immutable, versioned entry list (newest first)
+
+    A new snapshot with a higher version is published whenever the corpus
+    changes; readers holding an older snapshot keep a consistent view.
+    """
+
+    __slots__ = ("version", "entries")
+
+    def __init__(self, version: int, entries: List[Dict[str, Any]]):
+        self.version = version
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class CorpusView:
+    """Read-only window onto a snapshot, optionally restricted to one author
+
+    Creating a view never copies the entry list. An author-restricted view
+    is resolved through ``index`` (the agent's secondary indexes, kept in step
+    with the published snapshot) in O(log n + k); without one it filters the
+    snapshot lazily while iterating.
+    """
+
+    def __init__(self, snapshot: CorpusSnapshot, author: Optional[str] = None, index: Optional[EntryIndex] = None):
+        self.snapshot = snapshot
+        self.author = author
+        self.index = index
+        self._author_key = author_key(author) if author else None
+        self._author_entries: Optional[List[Dict[str, Any]]] = None
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        return self._author_key is None or author_key(entry['author']) == self._author_key
+
+    def _resolve_author(self) -> List[Dict[str, Any]]:
+        if self._author_entries is None:
+            if self.index is not None:
+                self._author_entries = self.index.query(author=self.author)
+            else:
+                self._author_entries = [entry for entry in self.snapshot.entries if self.matches(entry)]
+        return self._author_entries
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._author_key is None:
+            return iter(self.snapshot.entries)
+        return iter(self._resolve_author())
+
+    def __len__(self) -> int:
+        if self._author_key is None:
+            return len(self.snapshot)
+        return len(self._resolve_author())
+
+# The view the agent tools read from for the request being handled. Set per
+# query; LangChain copies the context into the threads tools run on.
+current_view: ContextVar[Optional[CorpusView]] = ContextVar("current_view", default=None)
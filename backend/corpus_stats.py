@@ -0,0 +1,222 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from entry_index import author_key, tag_keys
+
+INTERVALS = ("day", "week", "month")
+
+# Upper bound for "since" comparisons: free-text dates ("someday") sort after every real date
+DATE_MAX = "9999-12-31"
+
+def period_key(date_str: str, interval: str) -> str:
+    """Histogram bucket of a YYYY-MM-DD date: the day, ISO week (2024-W25) or month (2024-06)"""
+    try:
+        day = datetime.strptime(date_str, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return "undated"
+    if interval == "month":
+        return date_str[:7]
+    if interval == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return date_str
+
+class _Counts:
+    """Counters for one scope: the whole corpus or one author"""
+
+    __slots__ = ("entries", "sections", "tags", "days")
+
+    def __init__(self):
+        self.entries = 0
+        # experiments, results, observations
+        self.sections = [0, 0, 0]
+        # case-folded tag -> entries
+        self.tags: Counter = Counter()
+        # YYYY-MM-DD -> entries
+        self.days: Counter = Counter()
+
+    def apply(self, date: str, tags: List[str], sections: Tuple[int, int, int], sign: int):
+        self.entries += sign
+        for i, count in enumerate(sections):
+            self.sections[i] += sign * count
+        for tag in tags:
+            self.tags[tag] += sign
+            if not self.tags[tag]:
+                del self.tags[tag]
+        self.days[date] += sign
+        if not self.days[date]:
+            del self.days[date]
+
+class CorpusStats:
+    """Entry, section, tag and per-day counts, kept current one changed entry at a time
+
+    Counters exist for the whole corpus and for each (case-folded) author, so
+    dashboard numbers and the summary prompt's statistics never rescan the
+    entries. Derived views (overviews, facets, histograms) are memoized until
+    the next change.
+    """
+
+    def __init__(self):
+        # file_path -> (author key, date, tag keys, section counts) it was counted with
+        self._counted: Dict[str, Tuple[str, str, List[str], Tuple[int, int, int]]] = {}
+        # file_path -> entry object, for identity-based sync()
+        self._entries: Dict[str, Any] = {}
+        self._total = _Counts()
+        self._by_author: Dict[str, _Counts] = {}
+        # Display names: first spelling seen for each case-folded author and tag
+        self._author_names: Dict[str, str] = {}
+        self._tag_names: Dict[str, str] = {}
+        # Bumped on every change, which also drops the memoized views
+        self.version = 0
+        self._memo: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.RLock()
+
+    def add(self, entry: Dict[str, Any]):
+        """Count an entry, replacing any previous version with the same file path"""
+        with self._lock:
+            file_path = entry['file_path']
+            if file_path in self._counted:
+                self.remove(file_path)
+            author = author_key(entry['author'])
+            date = str(entry['date'])
+            tags = tag_keys(entry)
+            sections = entry.section_counts()
+            self._counted[file_path] = (author, date, tags, sections)
+            self._entries[file_path] = entry
+            self._author_names.setdefault(author, str(entry['author']))
+            raw_tags = entry.get('tags') or []
+            for tag in [raw_tags] if isinstance(raw_tags, str) else raw_tags:
+                self._tag_names.setdefault(str(tag).casefold(), str(tag))
+            self._total.apply(date, tags, sections, 1)
+            self._by_author.setdefault(author, _Counts()).apply(date, tags, sections, 1)
+            self._changed()
+
+    def remove(self, file_path: str):
+        with self._lock:
+            counted = self._counted.pop(file_path, None)
+            if counted is None:
+                return
+            del self._entries[file_path]
+            author, date, tags, sections = counted
+            self._total.apply(date, tags, sections, -1)
+            scope = self._by_author[author]
+            scope.apply(date, tags, sections, -1)
+            if not scope.entries:
+                del self._by_author[author]
+                del self._author_names[author]
+            self._changed()
+
+    def sync(self, entries: List[Dict[str, Any]]):
+        """Bring the counters in line with an entry list, touching only entries whose object changed"""
+        with self._lock:
+            current = {entry['file_path']: entry for entry in entries}
+            for file_path in [file_path for file_path in self._counted if file_path not in current]:
+                self.remove(file_path)
+            for file_path, entry in current.items():
+                if self._entries.get(file_path) is not entry:
+                    self.add(entry)
+
+    def _changed(self):
+        self.version += 1
+        self._memo.clear()
+
+    def _scope(self, author: Optional[str]) -> _Counts:
+        if not author:
+            return self._total
+        return self._by_author.get(author_key(author)) or _Counts()
+
+    def _memoized(self, key: Tuple[Any, ...], compute):
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    def overview(self, author: Optional[str] = None, recent_days: int = 30) -> Dict[str, int]:
+        """Headline numbers for the corpus or one author
+
+        ``recent_entries`` counts entries dated within the last ``recent_days``
+        days (or later).
+        """
+        cutoff = (datetime.now() - timedelta(days=recent_days)).strftime('%Y-%m-%d')
+
+        def compute() -> Dict[str, int]:
+            scope = self._scope(author)
+            return {
+                "total_entries": scope.entries,
+                "authors": (1 if scope.entries else 0) if author else len(self._by_author),
+                "recent_entries": sum(count for day, count in scope.days.items() if cutoff <= day <= DATE_MAX),
+                "total_experiments": scope.sections[0],
+                "total_results": scope.sections[1],
+                "total_observations": scope.sections[2]
+            }
+
+        return self._memoized(("overview", author_key(author) if author else None, cutoff), compute)
+
+    def authors(self) -> List[Dict[str, Any]]:
+        """Per-author entry and section counts, most active first"""
+        def compute() -> List[Dict[str, Any]]:
+            rows = [
+                {
+                    "author": self._author_names[key],
+                    "entries": scope.entries,
+                    "experiments": scope.sections[0],
+                    "results": scope.sections[1],
+                    "observations": scope.sections[2]
+                }
+                for key, scope in self._by_author.items()
+            ]
+            rows.sort(key=lambda row: (-row["entries"], row["author"].casefold()))
+            return rows
+
+        return self._memoized(("authors",), compute)
+
+    def activity_since(self, date_from: str) -> Dict[str, int]:
+        """Entries per author dated on or after date_from, most active first"""
+        def compute() -> Dict[str, int]:
+            counts = {}
+            for key, scope in self._by_author.items():
+                count = sum(n for day, n in scope.days.items() if date_from <= day <= DATE_MAX)
+                if count:
+                    counts[self._author_names[key]] = count
+            return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0].casefold())))
+
+        return self._memoized(("activity", date_from), compute)
+
+    def tag_facets(self, author: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tags with their entry counts, most used first"""
+        def compute() -> List[Dict[str, Any]]:
+            ranked = sorted(self._scope(author).tags.items(), key=lambda item: (-item[1], item[0]))
+            return [{"tag": self._tag_names.get(tag, tag), "count": count} for tag, count in ranked]
+
+        facets = self._memoized(("tags", author_key(author) if author else None), compute)
+        return facets[:limit] if limit is not None else facets
+
+    def histogram(
+        self,
+        author: Optional[str] = None,
+        interval: str = "day",
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries per day, ISO week or month, oldest first
+
+        Entries without a usable date are bucketed last as "undated", unless
+        date bounds are given.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+
+        def compute() -> List[Dict[str, Any]]:
+            buckets: Counter = Counter()
+            for day, count in self._scope(author).days.items():
+                period = period_key(day, interval)
+                if date_from or date_to:
+                    if period == "undated" or (date_from and day < date_from) or (date_to and day > date_to):
+                        continue
+                buckets[period] += count
+            periods = sorted(buckets, key=lambda period: (period == "undated", period))
+            return [{"period": period, "entries": buckets[period]} for period in periods]
+
+        return self._memoized(("histogram", author_key(author) if author else None, interval, date_from, date_to), compute)
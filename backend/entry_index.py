@@ -0,0 +1,162 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+# (date, file_path); entries are listed newest date first, ties by path
+Key = Tuple[str, str]
+
+def author_key(author: Any) -> str:
+    return str(author).casefold()
+
+def tag_keys(entry: Dict[str, Any]) -> List[str]:
+    tags = entry.get('tags') or []
+    if isinstance(tags, str):
+        tags = [tags]
+    return sorted({str(tag).casefold() for tag in tags})
+
+class _SortedKeys:
+    """Keys kept in ascending (date, path) order for bisect range scans"""
+
+    def __init__(self):
+        self.keys: List[Key] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: Key):
+        insort(self.keys, key)
+
+    def remove(self, key: Key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def newest_first(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        after: Optional[Key] = None
+    ) -> Iterator[Key]:
+        """Keys within the inclusive date range, newest date first and ascending path within a date
+
+        ``after`` resumes a listing just past that key.
+        """
+        keys = self.keys
+        lo = bisect_left(keys, (date_from,)) if date_from else 0
+        # (d + "\0",) sorts after every (d, path) and before any later date
+        hi = bisect_left(keys, (date_to + "\0",)) if date_to else len(keys)
+        if after:
+            hi = min(hi, bisect_left(keys, (after[0] + "\0",)))
+        end = hi
+        while end > lo:
+            date = keys[end - 1][0]
+            start = max(lo, bisect_left(keys, (date,), lo, end))
+            first = start
+            if after and date == after[0]:
+                first = bisect_right(keys, after, start, end)
+            yield from keys[first:end]
+            end = start
+
+class EntryIndex:
+    """In-memory secondary indexes over logbook entries
+
+    Keeps a date-ordered key array for the whole corpus plus one per
+    case-folded author and per case-folded tag, so "latest N", "by user" and
+    date-range lookups cost O(log n + k) instead of a scan and re-sort.
+    Entries are added and removed one at a time as files change.
+    """
+
+    def __init__(self):
+        # file_path -> entry dict
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._all = _SortedKeys()
+        self._by_author: Dict[str, _SortedKeys] = {}
+        self._by_tag: Dict[str, _SortedKeys] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(entry: Dict[str, Any]) -> Key:
+        return str(entry['date']), entry['file_path']
+
+    def add(self, entry: Dict[str, Any]):
+        """Index an entry, replacing any previous version with the same file path"""
+        with self._lock:
+            file_path = entry['file_path']
+            if file_path in self._entries:
+                self.remove(file_path)
+            key = self._key(entry)
+            self._entries[file_path] = entry
+            self._all.add(key)
+            self._by_author.setdefault(author_key(entry['author']), _SortedKeys()).add(key)
+            for tag in tag_keys(entry):
+                self._by_tag.setdefault(tag, _SortedKeys()).add(key)
+
+    def remove(self, file_path: str):
+        with self._lock:
+            entry = self._entries.pop(file_path, None)
+            if entry is None:
+                return
+            key = self._key(entry)
+            self._all.remove(key)
+            self._discard(self._by_author, author_key(entry['author']), key)
+            for tag in tag_keys(entry):
+                self._discard(self._by_tag, tag, key)
+
+    @staticmethod
+    def _discard(index: Dict[str, _SortedKeys], name: str, key: Key):
+        keys = index.get(name)
+        if keys is not None:
+            keys.remove(key)
+            if not keys:
+                del index[name]
+
+    def sync(self, entries: List[Dict[str, Any]]):
+        """Bring the index in line with an entry list, touching only entries whose object changed"""
+        with self._lock:
+            current = {entry['file_path']: entry for entry in entries}
+            for file_path in [file_path for file_path in self._entries if file_path not in current]:
+                self.remove(file_path)
+            for file_path, entry in current.items():
+                if self._entries.get(file_path) is not entry:
+                    self.add(entry)
+
+    def query(
+        self,
+        author: Optional[str] = None,
+        tag: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Key] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries matching all filters, newest first
+
+        Author and tag match case-insensitively; dates are inclusive
+        YYYY-MM-DD bounds; ``after`` is a (date, file_path) keyset cursor.
+        The smallest candidate list (author or tag) is scanned and the other
+        filter checked per entry.
+        """
+        with self._lock:
+            candidates = [self._all]
+            if author:
+                candidates.append(self._by_author.get(author_key(author), _SortedKeys()))
+            if tag:
+                candidates.append(self._by_tag.get(tag.casefold(), _SortedKeys()))
+            keys = min(candidates, key=len)
+            author_name = author_key(author) if author else None
+            tag_name = tag.casefold() if tag else None
+
+            results = []
+            for _, file_path in keys.newest_first(date_from, date_to, after):
+                entry = self._entries[file_path]
+                if author_name is not None and author_key(entry['author']) != author_name:
+                    continue
+                if tag_name is not None and tag_name not in tag_keys(entry):
+                    continue
+                results.append(entry)
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
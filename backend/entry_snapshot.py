@@ -0,0 +1,356 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from logbook_entry import LogbookEntry, SectionRef
+
+MAGIC = b"LBSNAPSH"
+# Bump when the file layout changes
+FORMAT_VERSION = 2
+# Bump when the parser's extraction rules or the shape of entries change; the
+# snapshot is a derived cache of the markdown files, so it is simply rebuilt
+SCHEMA_VERSION = 4
+# Written in native byte order; a file from a machine with the other order reads back swapped
+BYTE_ORDER_MARK = 0x01020304
+
+# magic, byte order mark, format version, schema version, entries, tag refs,
+# sections, values, logbook dir value id, tree signature (hex sha1)
+_HEADER = struct.Struct("=8sIIIIIIII40s")
+_HEADER_SIZE = (_HEADER.size + 7) // 8 * 8
+
+def _pad(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+def _layout(n_entries: int, n_tags: int, n_sections: int, n_values: int) -> List[Tuple[str, str, int]]:
+    """(column, array typecode, length) of every column in file order, 8-byte columns first"""
+    return [
+        ("mtime_ns", "q", n_entries),
+        ("size", "q", n_entries),
+        ("body_start", "q", n_entries),
+        ("body_end", "q", n_entries),
+        ("section_start", "q", n_sections),
+        ("section_end", "q", n_sections),
+        ("value_offsets", "Q", n_values + 1),
+        ("path_id", "I", n_entries),
+        ("author_id", "I", n_entries),
+        ("date_id", "I", n_entries),
+        ("title_id", "I", n_entries),
+        ("tag_offsets", "I", n_entries + 1),
+        ("tag_ids", "I", n_tags),
+        ("section_offsets", "I", n_entries + 1),
+        ("section_kind", "I", n_sections),
+        ("section_prefix_id", "I", n_sections)
+    ]
+
+def _encode_value(value: Any) -> bytes:
+    """One type byte and the value's text, so frontmatter values round-trip with their type"""
+    if isinstance(value, str):
+        return b"s" + value.encode('utf-8')
+    if value is None:
+        return b"n"
+    if isinstance(value, bool):
+        return b"b1" if value else b"b0"
+    if isinstance(value, int):
+        return b"i" + str(value).encode('ascii')
+    if isinstance(value, float):
+        return b"f" + repr(value).encode('ascii')
+    if isinstance(value, datetime):
+        return b"t" + value.isoformat().encode('ascii')
+    if isinstance(value, date):
+        return b"d" + value.isoformat().encode('ascii')
+    return b"j" + json.dumps(value, default=str).encode('utf-8')
+
+def _decode_value(raw: memoryview) -> Any:
+    kind, text = bytes(raw[:1]), str(raw[1:], 'utf-8')
+    if kind == b"s":
+        return text
+    if kind == b"n":
+        return None
+    if kind == b"b":
+        return text == "1"
+    if kind == b"i":
+        return int(text)
+    if kind == b"f":
+        return float(text)
+    if kind == b"t":
+        return datetime.fromisoformat(text)
+    if kind == b"d":
+        return date.fromisoformat(text)
+    if kind == b"j":
+        return json.loads(text)
+    raise ValueError(f"unknown value type {kind!r}")
+
+class MappedSnapshot:
+    """Read-only columns of one snapshot file, mapped for as long as entries refer to it
+
+    Values (paths, authors, dates, titles, tags, section headings) are
+    decoded on first access and kept, so each distinct value is decoded at
+    most once however many entries share it.
+    """
+
+    def __init__(self, data: mmap.mmap, columns: Dict[str, memoryview], blob: memoryview, n_values: int):
+        self._data = data
+        self.columns = columns
+        self._blob = blob
+        self._values: List[Any] = [None] * n_values
+        self._decoded = bytearray(n_values)
+        self._lock = threading.Lock()
+
+    def value(self, value_id: int) -> Any:
+        if not self._decoded[value_id]:
+            offsets = self.columns["value_offsets"]
+            value = _decode_value(self._blob[offsets[value_id]:offsets[value_id + 1]])
+            with self._lock:
+                # Another thread may have won; keep its object so equal values stay one object
+                if not self._decoded[value_id]:
+                    self._values[value_id] = value
+                    self._decoded[value_id] = 1
+        return self._values[value_id]
+
+    def raw(self, value_id: int) -> bytes:
+        """Encoded form of a value, for copying it into a new snapshot without decoding"""
+        offsets = self.columns["value_offsets"]
+        return bytes(self._blob[offsets[value_id]:offsets[value_id + 1]])
+
+class SnapshotEntry(LogbookEntry):
+    """A LogbookEntry whose fields are read from a row of a mapped snapshot on access
+
+    Only the row number is held per entry; nothing is decoded until a field
+    is used. Behaves exactly like the parsed entry the row was written from.
+    """
+
+    __slots__ = ("_snapshot", "_row")
+
+    def __init__(self, snapshot: MappedSnapshot, row: int):
+        self._snapshot = snapshot
+        self._row = row
+
+    def _column(self, name: str) -> Any:
+        return self._snapshot.columns[name][self._row]
+
+    @property
+    def file_path(self) -> str:
+        return self._snapshot.value(self._column("path_id"))
+
+    @property
+    def author(self) -> Any:
+        return self._snapshot.value(self._column("author_id"))
+
+    @property
+    def date(self) -> str:
+        return self._snapshot.value(self._column("date_id"))
+
+    @property
+    def title(self) -> Any:
+        return self._snapshot.value(self._column("title_id"))
+
+    @property
+    def _tags(self) -> Tuple[Any, ...]:
+        columns = self._snapshot.columns
+        start, end = columns["tag_offsets"][self._row], columns["tag_offsets"][self._row + 1]
+        return tuple(self._snapshot.value(tag_id) for tag_id in columns["tag_ids"][start:end])
+
+    @property
+    def mtime_ns(self) -> int:
+        return self._column("mtime_ns")
+
+    @property
+    def size(self) -> int:
+        return self._column("size")
+
+    @property
+    def body_start(self) -> int:
+        return self._column("body_start")
+
+    @property
+    def body_end(self) -> int:
+        return self._column("body_end")
+
+    @property
+    def _sections(self) -> Tuple[SectionRef, ...]:
+        columns = self._snapshot.columns
+        start, end = columns["section_offsets"][self._row], columns["section_offsets"][self._row + 1]
+        return tuple(
+            (
+                columns["section_kind"][j],
+                self._snapshot.value(columns["section_prefix_id"][j]),
+                columns["section_start"][j],
+                columns["section_end"][j]
+            )
+            for j in range(start, end)
+        )
+
+class EntrySnapshot:
+    """Columnar, memory-mapped snapshot of the parsed corpus
+
+    The whole entry cache is one file: fixed-width columns of per-entry
+    numbers and value ids (path, author, date, title, tag and section
+    heading ids, with tag and section lists as offset ranges into shared
+    columns), followed by a single blob holding every distinct value once
+    (type byte plus text) with an offsets column. Loading maps the file
+    read-only and keeps it mapped: entries are SnapshotEntry views over
+    their row, decoded lazily, so a restarted worker has its cache back
+    without parsing markdown, YAML or JSON, and workers that loaded the same
+    file share its pages.
+
+    A snapshot records the logbook directory and the tree signature (the
+    parser's corpus version) it was written for. Files from another format,
+    schema, byte order or directory are ignored; per-entry (mtime, size)
+    signatures still let the parser's first scan re-parse anything that
+    changed since, and ``signature`` tells it whether the file needs
+    rewriting. Replacing the file never disturbs processes still mapping
+    the previous one.
+    """
+
+    def __init__(self, path: str = ".cache/entries.snapshot"):
+        self.path = path
+        # Tree signature of the file last loaded or written; None if there is none
+        self.signature: Optional[str] = None
+
+    def load(self, logbook_dir: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Entries as file_path -> {"mtime_ns", "size", "entry"}, or None if no usable snapshot exists"""
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < _HEADER_SIZE:
+                    return None
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Ignoring unreadable entry snapshot {self.path}: {e}")
+            return None
+        # Views into the map; released (and the map closed) unless entries end up using them
+        views = [memoryview(data)]
+        try:
+            cache = self._read(data, views, logbook_dir)
+        except (ValueError, UnicodeDecodeError, IndexError) as e:
+            print(f"Ignoring unreadable entry snapshot {self.path}: {e}")
+            cache = None
+        if cache is None:
+            for view in reversed(views):
+                view.release()
+            data.close()
+        return cache
+
+    def _read(self, data: mmap.mmap, views: List[memoryview], logbook_dir: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        view = views[0]
+        (magic, byte_order, format_version, schema_version,
+         n_entries, n_tags, n_sections, n_values, dir_id, signature) = _HEADER.unpack_from(view)
+        if (magic, byte_order, format_version, schema_version) != (MAGIC, BYTE_ORDER_MARK, FORMAT_VERSION, SCHEMA_VERSION):
+            return None
+
+        layout = _layout(n_entries, n_tags, n_sections, n_values)
+        if _HEADER_SIZE + sum(_pad(length * array(typecode).itemsize) for _, typecode, length in layout) > len(view):
+            raise ValueError("truncated columns")
+        columns = {}
+        offset = _HEADER_SIZE
+        for name, typecode, length in layout:
+            width = array(typecode).itemsize
+            columns[name] = view[offset:offset + length * width].cast(typecode)
+            views.append(columns[name])
+            offset = _pad(offset + length * width)
+        blob = view[offset:]
+        views.append(blob)
+        if len(blob) != columns["value_offsets"][n_values]:
+            raise ValueError("truncated value blob")
+
+        snapshot = MappedSnapshot(data, columns, blob, n_values)
+        if snapshot.value(dir_id) != os.path.abspath(logbook_dir):
+            return None
+
+        # File paths and signatures are needed up front to key the cache and compare against the tree
+        path_id, mtime_ns, size = columns["path_id"], columns["mtime_ns"], columns["size"]
+        cache = {
+            snapshot.value(path_id[row]): {"mtime_ns": mtime_ns[row], "size": size[row], "entry": SnapshotEntry(snapshot, row)}
+            for row in range(n_entries)
+        }
+        self.signature = signature.decode('ascii')
+        return cache
+
+    def write(self, entries: List[LogbookEntry], logbook_dir: str, signature: str):
+        """Atomically replace the snapshot with these entries, recorded as tree version ``signature``"""
+        value_ids: Dict[bytes, int] = {}
+
+        def value_id(value: Any) -> int:
+            encoded = _encode_value(value)
+            if encoded not in value_ids:
+                value_ids[encoded] = len(value_ids)
+            return value_ids[encoded]
+
+        # Rows of a loaded snapshot are copied column by column, their values by id,
+        # so rewriting a mostly unchanged corpus decodes nothing
+        copied: Dict[Tuple[MappedSnapshot, int], int] = {}
+
+        def copied_id(snapshot: MappedSnapshot, old_id: int) -> int:
+            key = (snapshot, old_id)
+            if key not in copied:
+                encoded = snapshot.raw(old_id)
+                if encoded not in value_ids:
+                    value_ids[encoded] = len(value_ids)
+                copied[key] = value_ids[encoded]
+            return copied[key]
+
+        dir_id = value_id(os.path.abspath(logbook_dir))
+        columns = {name: array(typecode) for name, typecode, _ in _layout(0, 0, 0, 0)}
+        columns["tag_offsets"].append(0)
+        columns["section_offsets"].append(0)
+        for entry in entries:
+            if isinstance(entry, SnapshotEntry):
+                snapshot, row = entry._snapshot, entry._row
+                source = snapshot.columns
+                for name in ("mtime_ns", "size", "body_start", "body_end"):
+                    columns[name].append(source[name][row])
+                for name in ("path_id", "author_id", "date_id", "title_id"):
+                    columns[name].append(copied_id(snapshot, source[name][row]))
+                start, end = source["tag_offsets"][row], source["tag_offsets"][row + 1]
+                columns["tag_ids"].extend(copied_id(snapshot, tag_id) for tag_id in source["tag_ids"][start:end])
+                columns["tag_offsets"].append(len(columns["tag_ids"]))
+                start, end = source["section_offsets"][row], source["section_offsets"][row + 1]
+                columns["section_kind"].extend(source["section_kind"][start:end])
+                columns["section_prefix_id"].extend(copied_id(snapshot, prefix_id) for prefix_id in source["section_prefix_id"][start:end])
+                columns["section_start"].extend(source["section_start"][start:end])
+                columns["section_end"].extend(source["section_end"][start:end])
+                columns["section_offsets"].append(len(columns["section_kind"]))
+                continue
+            columns["mtime_ns"].append(entry.mtime_ns)
+            columns["size"].append(entry.size)
+            columns["body_start"].append(entry.body_start)
+            columns["body_end"].append(entry.body_end)
+            columns["path_id"].append(value_id(entry.file_path))
+            columns["author_id"].append(value_id(entry.author))
+            columns["date_id"].append(value_id(entry.date))
+            columns["title_id"].append(value_id(entry.title))
+            columns["tag_ids"].extend(value_id(tag) for tag in entry.tags)
+            columns["tag_offsets"].append(len(columns["tag_ids"]))
+            for kind, prefix, start, end in entry.section_refs():
+                columns["section_kind"].append(kind)
+                columns["section_prefix_id"].append(value_id(prefix))
+                columns["section_start"].append(start)
+                columns["section_end"].append(end)
+            columns["section_offsets"].append(len(columns["section_kind"]))
+
+        value_offsets = columns["value_offsets"]
+        value_offsets.append(0)
+        for encoded in value_ids:
+            value_offsets.append(value_offsets[-1] + len(encoded))
+
+        header = _HEADER.pack(
+            MAGIC, BYTE_ORDER_MARK, FORMAT_VERSION, SCHEMA_VERSION,
+            len(entries), len(columns["tag_ids"]), len(columns["section_kind"]), len(value_ids),
+            dir_id, signature.encode('ascii')
+        )
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header.ljust(_HEADER_SIZE, b'\0'))
+            for name, _, _ in _layout(0, 0, 0, 0):
+                data = columns[name].tobytes()
+                f.write(data.ljust(_pad(len(data)), b'\0'))
+            f.write(b"".join(value_ids))
+        os.replace(tmp_path, self.path)
+        self.signature = signature
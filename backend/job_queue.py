@@ -0,0 +1,354 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: owners are then checked by pid alone
+    fcntl = None
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+FINISHED_STATUSES = ("done", "failed")
+
+class JobQueueFull(Exception):
+    """Raised when too many refinement jobs are already waiting"""
+
+class RefinementJobQueue:
+    """Background refinement of new entries with a bounded worker pool
+
+    ``submit`` writes the rough draft to ``jobs_dir`` as a job file and
+    returns at once; worker threads pick jobs up, refine them through the
+    agent (obtained from ``get_agent`` when the first batch runs, so the LLM
+    stack is not loaded just to accept jobs) and save the result with the
+    parser. Up to ``batch_size`` waiting
+    jobs are refined together in one scheduler session. A failed attempt is
+    retried with exponential backoff until ``max_attempts`` is reached.
+    Job files survive restarts: unfinished jobs are resumed by ``start``,
+    finished ones are kept for ``retention_seconds`` so clients can collect
+    their results.
+
+    Several processes (uvicorn workers) can share ``jobs_dir``. Every
+    unfinished job records the queue that owns it; an owner holds an
+    exclusive lock on ``owners/<owner>.lock`` for as long as it runs, so
+    ``start`` only takes over jobs whose owner's lock is free (the process
+    stopped or died), and does so under a directory lock so two restarting
+    workers never claim the same job. ``get`` falls back to the job file,
+    so any worker can report on any job; this queue only keeps unfinished
+    jobs in memory and reads finished ones back from their files.
+    """
+
+    def __init__(
+        self,
+        get_agent: Callable[[], Any],
+        parser: Any,
+        jobs_dir: str = ".cache/jobs",
+        workers: int = 2,
+        batch_size: int = 4,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        max_pending: int = 1000,
+        retention_seconds: float = 7 * 24 * 3600
+    ):
+        self.get_agent = get_agent
+        self.parser = parser
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        # Unfinished jobs this queue owns; finished ones are dropped once persisted
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._unfinished = 0
+        # Jobs this queue finished since it was created, by status
+        self._finished = {status: 0 for status in FINISHED_STATUSES}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._timers: Dict[str, threading.Timer] = {}
+        # Identifies this queue in job files; unique even if a pid is reused
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._owner_lock = None
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _owner_path(self, owner: str) -> str:
+        return os.path.join(self.jobs_dir, "owners", f"{owner}.lock")
+
+    def _hold_owner_lock(self):
+        """Lock this queue's owner file for the queue's lifetime; the OS drops it if the process dies"""
+        os.makedirs(os.path.dirname(self._owner_path(self.owner)), exist_ok=True)
+        self._owner_lock = open(self._owner_path(self.owner), 'a')
+        if fcntl is not None:
+            fcntl.flock(self._owner_lock.fileno(), fcntl.LOCK_EX)
+
+    def _release_owner_lock(self):
+        if self._owner_lock is None:
+            return
+        try:
+            os.remove(self._owner_path(self.owner))
+        except OSError:
+            pass
+        self._owner_lock.close()
+        self._owner_lock = None
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        if owner == self.owner:
+            return True
+        if not owner:
+            return False
+        path = self._owner_path(owner)
+        if fcntl is None:
+            pid = owner.split('-', 1)[0]
+            if not os.path.exists(path) or not pid.isdigit():
+                return False
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except OSError:
+                pass
+            return True
+        try:
+            with open(path, 'a') as f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return True
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        return False
+
+    @contextmanager
+    def _directory_lock(self) -> Iterator[None]:
+        """Serialize job takeovers and pruning across processes sharing jobs_dir"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.jobs_dir, ".lock"), 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _persist(self, job: Dict[str, Any]):
+        """Durably write a job file (fsync, then atomic rename)"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        path = self._job_path(job['id'])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _update(self, job_id: str, **changes: Any) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs[job_id]
+            was_finished = job['status'] in FINISHED_STATUSES
+            job.update(changes, updated_at=time.time())
+            snapshot = dict(job)
+            if not was_finished and job['status'] in FINISHED_STATUSES:
+                self._unfinished -= 1
+                self._finished[job['status']] += 1
+        try:
+            self._persist(snapshot)
+        except OSError as e:
+            # Keep serving it from memory
+            print(f"Error writing job {job_id}: {e}")
+            return snapshot
+        if snapshot['status'] in FINISHED_STATUSES:
+            # Its file is the only copy from now on; get() reads it back
+            with self._lock:
+                self._jobs.pop(job_id, None)
+        return snapshot
+
+    def start(self):
+        """Load job files, resume unfinished jobs and start the workers"""
+        if self._threads:
+            return
+        self._stop.clear()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._hold_owner_lock()
+        self._load()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"refine-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers; queued jobs stay on disk and resume on the next start"""
+        self._stop.set()
+        with self._lock:
+            timers = list(self._timers.values())
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        # Unfinished jobs become orphans the next queue to start takes over
+        self._release_owner_lock()
+
+    def _read_job(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable job file {path}: {e}")
+            return None
+
+    def _load(self):
+        """Prune expired jobs and take over unfinished jobs whose owner is gone"""
+        now = time.time()
+        resumed = []
+        with self._directory_lock():
+            for item in os.scandir(self.jobs_dir):
+                if not item.name.endswith('.json'):
+                    continue
+                job = self._read_job(item.path)
+                if job is None:
+                    continue
+                if job['status'] in FINISHED_STATUSES:
+                    if now - job['updated_at'] > self.retention_seconds:
+                        os.remove(item.path)
+                    continue
+                if self._owner_alive(job.get('owner')):
+                    # Queued or running in another live worker
+                    continue
+                # Interrupted while running or waiting to retry: start over from the queue
+                job.update(status="pending", owner=self.owner, updated_at=now)
+                try:
+                    self._persist(job)
+                except OSError as e:
+                    print(f"Error writing job {job['id']}: {e}")
+                    continue
+                resumed.append(job)
+        with self._lock:
+            for job in resumed:
+                self._jobs[job['id']] = job
+            self._unfinished += len(resumed)
+        for job in sorted(resumed, key=lambda job: job['created_at']):
+            self._queue.put(job['id'])
+
+    def submit(self, author: str, title: str, rough_description: str, tags: List[str]) -> Dict[str, Any]:
+        """Persist a draft as a pending job and queue it; returns the job"""
+        with self._lock:
+            if self._unfinished >= self.max_pending:
+                raise JobQueueFull(f"{self._unfinished} refinement jobs are already waiting")
+            now = time.time()
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": "pending",
+                "author": author,
+                "title": title,
+                "rough_description": rough_description,
+                "tags": tags,
+                "attempts": 0,
+                "error": None,
+                "file_path": None,
+                "refined_content": None,
+                "owner": self.owner,
+                "created_at": now,
+                "updated_at": now
+            }
+            self._jobs[job['id']] = job
+            self._unfinished += 1
+            snapshot = dict(job)
+        # On disk before the client is told it was accepted
+        self._persist(snapshot)
+        self._queue.put(job['id'])
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job by id: this queue's copy, else the job file another worker wrote"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        return self._read_job(self._job_path(job_id))
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Take whatever else is already waiting, up to one batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                print(f"Error in refinement worker: {e}")
+
+    def _run_batch(self, job_ids: List[str]):
+        jobs = [self._update(job_id, status="running") for job_id in job_ids]
+        try:
+            outcomes = self.get_agent().refine_batch(jobs)
+        except Exception as e:
+            # No slot for the whole batch (e.g. the scheduler queue was full)
+            outcomes = [e] * len(jobs)
+
+        for job, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                self._fail(job, str(outcome))
+                continue
+            try:
+                file_path = self.parser.save_entry(
+                    author=job['author'],
+                    title=job['title'],
+                    content=outcome,
+                    tags=job['tags']
+                )
+            except Exception as e:
+                self._fail(job, f"Error saving entry: {e}")
+                continue
+            self._update(job['id'], status="done", attempts=job['attempts'] + 1, error=None,
+                         file_path=file_path, refined_content=outcome)
+
+    def _fail(self, job: Dict[str, Any], error: str):
+        attempts = job['attempts'] + 1
+        if attempts >= self.max_attempts:
+            self._update(job['id'], status="failed", attempts=attempts, error=error)
+            return
+        self._update(job['id'], status="retrying", attempts=attempts, error=error)
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        timer = threading.Timer(delay, self._requeue, args=(job['id'],))
+        timer.daemon = True
+        with self._lock:
+            self._timers[job['id']] = timer
+        timer.start()
+
+    def _requeue(self, job_id: str):
+        with self._lock:
+            self._timers.pop(job_id, None)
+        if not self._stop.is_set():
+            self._update(job_id, status="pending")
+            self._queue.put(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of this queue's unfinished jobs by status, of jobs it finished, and current queue depth"""
+        with self._lock:
+            counts = {"pending": 0, "running": 0, "retrying": 0, **self._finished}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {**counts, "queued": self._queue.qsize()}
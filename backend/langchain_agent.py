@@ -1,35 +1,102 @@
-from langchain.agents import initialize_agent, Tool
-from langchain.agents import AgentType
-from langchain_openai import ChatOpenAI
-from langchain_community.llms import LlamaCpp
-from langchain_community.chat_models import ChatOllama
-from langchain.schema import BaseMessage
-from langchain.tools import BaseTool
+# The agent framework and provider SDKs are imported where they are first used
+# (_get_executor, _build_llm) so loading this module stays cheap
+from langchain_core.tools import BaseTool
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.language_models.llms import LLM
-from langchain_core.callbacks import CallbackManagerForLLMRun
-from typing import List, Dict, Any, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun, BaseCallbackHandler
+from langchain_core.outputs import GenerationChunk
+from pydantic import PrivateAttr
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+import asyncio
 import json
+import math
+import queue
+import threading
 from datetime import datetime, timedelta
 import os
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from search_index import BM25Index
+from entry_index import EntryIndex, author_key
+from corpus_stats import CorpusStats, DATE_MAX
+from vector_index import VectorIndex
+from measurement_index import MeasurementIndex, GROUP_COLUMNS
+from llm_cache import LLMResponseCache
+from single_flight import SingleFlight
+from llm_scheduler import LLMScheduler, Priority, SchedulerRejected, DEFAULT_BACKEND_LIMITS
+from corpus import CorpusSnapshot, CorpusView, current_view
+from summarizer import HierarchicalSummarizer
+from context_builder import ContextBuilder, entry_header
+
 load_dotenv()
 
+# Shared HTTP settings for LM Studio: keep-alive pooling, generous read timeout for slow generations
+LMSTUDIO_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+LMSTUDIO_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+# LMStudioChat returns errors as text; responses starting with this are never cached
+LMSTUDIO_ERROR_PREFIX = "Error connecting to local model: "
+# Ranked search hits handed to the context builder, which keeps what fits the budget
+QUERY_CANDIDATES = 20
+
 class LMStudioChat(LLM):
-    """LangChain-compatible wrapper for LM Studio API"""
+    """LangChain-compatible wrapper for LM Studio API
+    
+    Sync and async calls each go through one pooled keep-alive httpx client,
+    so repeated calls reuse connections and async callers never block the
+    event loop.
+    """
     
     base_url: str = "http://127.0.0.1:1234"
     model: str = "gemma-3-12b"
     temperature: float = 0.1
+    # When set, _call streams internally so callbacks receive tokens as they arrive
+    streaming: bool = False
+    _client: Optional[httpx.Client] = PrivateAttr(default=None)
+    _async_client: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+    _async_loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
     
-    def __init__(self, base_url: str = "http://127.0.0.1:1234", model: str = "gemma-3-12b", temperature: float = 0.1, **kwargs):
+    def __init__(self, base_url: str = "http://127.0.0.1:1234", model: str = "gemma-3-12b", temperature: float = 0.1, streaming: bool = False, **kwargs):
         super().__init__(**kwargs)
         self.base_url = base_url.rstrip('/')
         self.model = model
         self.temperature = temperature
+        self.streaming = streaming
+    
+    def _payload(self, prompt: str, stop: Optional[List[str]], stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": 2000,
+            "stop": stop or [],
+            "stream": stream
+        }
+    
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, timeout=LMSTUDIO_TIMEOUT, limits=LMSTUDIO_LIMITS)
+        return self._client
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient is bound to the event loop it was first used on
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=LMSTUDIO_TIMEOUT, limits=LMSTUDIO_LIMITS)
+            self._async_loop = loop
+        return self._async_client
+    
+    @staticmethod
+    def _parse_stream_line(line: str) -> Tuple[bool, Optional[str]]:
+        """Parse one SSE line from the completions stream into (done, token)"""
+        if not line.startswith("data:"):
+            return False, None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return True, None
+        delta = json.loads(data)["choices"][0].get("delta", {})
+        return False, delta.get("content") or None
     
     @property
     def _llm_type(self) -> str:
@@ -42,63 +109,167 @@ class LMStudioChat(LLM):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> str:
+        if self.streaming:
+            return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
         try:
-            response = requests.post(
-                f"{self.base_url}/v1/chat/completions",
-                json={
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": self.temperature,
-                    "max_tokens": 2000,
-                    "stop": stop or []
-                },
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
+            response = self._get_client().post("/v1/chat/completions", json=self._payload(prompt, stop, stream=False))
             response.raise_for_status()
             data = response.json()
             return data["choices"][0]["message"]["content"]
         except Exception as e:
             print(f"LM Studio API error: {e}")
-            return f"Error connecting to local model: {str(e)}"
+            return f"{LMSTUDIO_ERROR_PREFIX}{str(e)}"
     
-    def invoke(self, input_data, config=None, **kwargs):
-        """For compatibility with invoke() calls"""
-        if isinstance(input_data, str):
-            prompt = input_data
-        else:
-            # Handle PromptValue or other message formats
-            prompt = str(input_data)
-        return self._call(prompt, **kwargs)
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.streaming:
+            return "".join([chunk.text async for chunk in self._astream(prompt, stop, run_manager, **kwargs)])
+        try:
+            response = await self._get_async_client().post("/v1/chat/completions", json=self._payload(prompt, stop, stream=False))
+            response.raise_for_status()
+            data = response.json()
+            return data["choices"][0]["message"]["content"]
+        except Exception as e:
+            print(f"LM Studio API error: {e}")
+            return f"{LMSTUDIO_ERROR_PREFIX}{str(e)}"
+    
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        """Yield completion tokens from LM Studio's server-sent event stream
+        
+        A connection error before the first token yields a single error chunk,
+        like _call(); one after partial output is raised.
+        """
+        streamed = False
+        try:
+            with self._get_client().stream("POST", "/v1/chat/completions", json=self._payload(prompt, stop, stream=True)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    done, token = self._parse_stream_line(line)
+                    if done:
+                        break
+                    if token:
+                        if run_manager:
+                            run_manager.on_llm_new_token(token)
+                        streamed = True
+                        yield GenerationChunk(text=token)
+        except Exception as e:
+            print(f"LM Studio API error: {e}")
+            if streamed:
+                # Appending an error chunk would pass the partial output off as a complete response
+                raise RuntimeError(f"{LMSTUDIO_ERROR_PREFIX}{str(e)}") from e
+            yield GenerationChunk(text=f"{LMSTUDIO_ERROR_PREFIX}{str(e)}")
+    
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        """Async counterpart of _stream"""
+        streamed = False
+        try:
+            async with self._get_async_client().stream("POST", "/v1/chat/completions", json=self._payload(prompt, stop, stream=True)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    done, token = self._parse_stream_line(line)
+                    if done:
+                        break
+                    if token:
+                        if run_manager:
+                            await run_manager.on_llm_new_token(token)
+                        streamed = True
+                        yield GenerationChunk(text=token)
+        except Exception as e:
+            print(f"LM Studio API error: {e}")
+            if streamed:
+                # Appending an error chunk would pass the partial output off as a complete response
+                raise RuntimeError(f"{LMSTUDIO_ERROR_PREFIX}{str(e)}") from e
+            yield GenerationChunk(text=f"{LMSTUDIO_ERROR_PREFIX}{str(e)}")
+    
+    async def aclose(self):
+        """Close the pooled HTTP connections"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+def _active_view() -> CorpusView:
+    """The corpus view of the request being served (empty outside a query)"""
+    view = current_view.get()
+    if view is None:
+        view = CorpusView(CorpusSnapshot(0, []))
+    return view
 
 class LogbookQueryTool(BaseTool):
     name: str = "logbook_query"
     description: str = "Query logbook entries to find specific information about experiments, results, or activities"
-    entries: List[Dict[str, Any]] = []
+    search_index: Optional[BM25Index] = None
+    context_builder: Optional[ContextBuilder] = None
     
-    def __init__(self, entries: List[Dict[str, Any]], **kwargs):
+    def __init__(self, search_index: BM25Index, context_builder: ContextBuilder, **kwargs):
         super().__init__(**kwargs)
-        self.entries = entries
+        self.search_index = search_index
+        self.context_builder = context_builder
     
     def _run(self, query: str) -> str:
         """Execute the query on logbook entries"""
-        # Simple text search for now - could be enhanced with vector search
-        matching_entries = []
-        query_lower = query.lower()
-        
-        for entry in self.entries:
-            # Search in various fields
-            searchable_text = f"{entry.get('title', '')} {entry.get('content', '')} {' '.join(entry.get('tags', []))}"
-            if query_lower in searchable_text.lower():
-                matching_entries.append(entry)
+        view = _active_view()
+        # The shared index covers the whole corpus; restrict it to the request's view
+        predicate = view.matches if view.author else None
         
-        if not matching_entries:
+        total, ranked = self.search_index.search(query, k=QUERY_CANDIDATES, predicate=predicate)
+        if not ranked:
             return "No matching entries found."
         
-        # Format results
-        result = f"Found {len(matching_entries)} matching entries:\n\n"
-        for entry in matching_entries[:5]:  # Limit to first 5 results
-            result += f"**{entry['title']}** by {entry['author']} ({entry['date']})\n"
+        # Keep the most relevant entries and sections that fit the backend's tool budget
+        packed = self.context_builder.pack(ranked, self.context_builder.budget("tool"), query=query)
+        
+        # Format results, best match first
+        result = f"Found {total} matching entries, showing the {len(packed)} most relevant:\n\n"
+        for entry, sections in packed:
+            result += entry_header(entry) + "\n"
+            for section, text in sections:
+                result += f"{section}: {text}\n"
+            result += "\n"
+        
+        return result
+
+class LogbookSemanticSearchTool(BaseTool):
+    name: str = "logbook_semantic_search"
+    description: str = "Find logbook sections (experiments, results, observations) that are semantically related to a question, even without exact keyword matches"
+    vector_index: Optional[VectorIndex] = None
+    
+    def __init__(self, vector_index: VectorIndex, **kwargs):
+        super().__init__(**kwargs)
+        self.vector_index = vector_index
+    
+    def _run(self, query: str) -> str:
+        """Return the entries whose sections are closest to the query"""
+        view = _active_view()
+        # The shared index covers the whole corpus; restrict it to the request's view
+        predicate = view.matches if view.author else None
+        
+        hits = self.vector_index.search(query, k=5, predicate=predicate)
+        if not hits:
+            return "No related entries found."
+        
+        result = f"Top {len(hits)} related entries:\n\n"
+        for score, entry, section in hits:
+            result += f"**{entry['title']}** by {entry['author']} ({entry['date']}), {section} section, similarity {score:.2f}\n"
             result += f"{entry['content'][:200]}...\n\n"
         
         return result
@@ -106,29 +277,30 @@ class LogbookQueryTool(BaseTool):
 class UserActivityTool(BaseTool):
     name: str = "user_activity"
     description: str = "Get activities and experiments for a specific user"
-    entries: List[Dict[str, Any]] = []
+    entry_index: Optional[EntryIndex] = None
     
-    def __init__(self, entries: List[Dict[str, Any]], **kwargs):
+    def __init__(self, entry_index: EntryIndex, **kwargs):
         super().__init__(**kwargs)
-        self.entries = entries
+        self.entry_index = entry_index
     
     def _run(self, user_name: str) -> str:
         """Get activities for a specific user"""
-        user_entries = [entry for entry in self.entries if entry['author'].lower() == user_name.lower()]
+        view = _active_view()
+        # The author index returns the user's entries newest first; the view may restrict authors further
+        user_entries = [entry for entry in self.entry_index.query(author=user_name.strip()) if view.matches(entry)]
         
         if not user_entries:
             return f"No entries found for user: {user_name}"
         
-        # Sort by date (newest first)
-        user_entries.sort(key=lambda x: x['date'], reverse=True)
-        
         result = f"Activities for {user_name} ({len(user_entries)} entries):\n\n"
         for entry in user_entries[:10]:  # Limit to recent 10 entries
             result += f"**{entry['date']}**: {entry['title']}\n"
-            if entry.get('experiments'):
-                result += f"  Experiments: {len(entry['experiments'])}\n"
-            if entry.get('results'):
-                result += f"  Results: {len(entry['results'])}\n"
+            # Counted from the entry's section offsets, without reading the file
+            experiments, results, _ = entry.section_counts()
+            if experiments:
+                result += f"  Experiments: {experiments}\n"
+            if results:
+                result += f"  Results: {results}\n"
             result += "\n"
         
         return result
@@ -136,11 +308,13 @@ class UserActivityTool(BaseTool):
 class TeamSummaryTool(BaseTool):
     name: str = "team_summary"
     description: str = "Generate a summary of team scientific activities"
-    entries: List[Dict[str, Any]] = []
+    entry_index: Optional[EntryIndex] = None
+    stats: Optional[CorpusStats] = None
     
-    def __init__(self, entries: List[Dict[str, Any]], **kwargs):
+    def __init__(self, entry_index: EntryIndex, stats: CorpusStats, **kwargs):
         super().__init__(**kwargs)
-        self.entries = entries
+        self.entry_index = entry_index
+        self.stats = stats
     
     def _run(self, time_period: str = "week") -> str:
         """Generate team activity summary"""
@@ -153,118 +327,450 @@ class TeamSummaryTool(BaseTool):
         else:
             start_date = now - timedelta(days=7)  # Default to week
         
-        # Filter entries by date
-        recent_entries = []
-        for entry in self.entries:
-            try:
-                entry_date = datetime.strptime(entry['date'], '%Y-%m-%d')
-                if entry_date >= start_date:
-                    recent_entries.append(entry)
-            except:
-                continue
+        # Per-author counts come from the corpus counters; only the titles shown are looked up
+        date_from = start_date.strftime('%Y-%m-%d')
+        view = _active_view()
+        author_activities = {
+            author: count for author, count in self.stats.activity_since(date_from).items()
+            if view.author is None or author_key(author) == author_key(view.author)
+        }
         
-        if not recent_entries:
+        if not author_activities:
             return f"No activities found in the last {time_period}."
         
-        # Group by author
-        author_activities = {}
-        for entry in recent_entries:
-            author = entry['author']
-            if author not in author_activities:
-                author_activities[author] = []
-            author_activities[author].append(entry)
-        
         # Generate summary
         result = f"Team Activity Summary - Last {time_period.title()}:\n\n"
-        result += f"Total entries: {len(recent_entries)}\n"
+        result += f"Total entries: {sum(author_activities.values())}\n"
         result += f"Active researchers: {len(author_activities)}\n\n"
         
-        for author, entries in author_activities.items():
-            result += f"**{author}** ({len(entries)} entries):\n"
-            for entry in entries[:3]:  # Show top 3 per person
+        for author, count in author_activities.items():
+            result += f"**{author}** ({count} entries):\n"
+            for entry in self.entry_index.query(author=author, date_from=date_from, date_to=DATE_MAX, limit=3):  # Show top 3 per person
                 result += f"  - {entry['date']}: {entry['title']}\n"
-            if len(entries) > 3:
-                result += f"  ... and {len(entries) - 3} more\n"
+            if count > 3:
+                result += f"  ... and {count - 3} more\n"
             result += "\n"
         
         return result
 
+class MeasurementQueryTool(BaseTool):
+    name: str = "measurement_query"
+    description: str = (
+        "Find or aggregate quantitative readings (value + unit) reported in Results sections. "
+        "Input is a JSON object with any of: label (e.g. \"lysozyme\"), unit (e.g. \"mg/ml\"; values "
+        "in other units of the same quantity are converted), min, max, author, date_from, date_to "
+        f"(YYYY-MM-DD) and group_by (one of {', '.join(GROUP_COLUMNS)}). Plain text searches labels"
+    )
+    measurement_index: Optional[MeasurementIndex] = None
+    
+    def __init__(self, measurement_index: MeasurementIndex, **kwargs):
+        super().__init__(**kwargs)
+        self.measurement_index = measurement_index
+    
+    def _run(self, query: str) -> str:
+        """List matching readings, or per-group statistics when group_by is given"""
+        try:
+            params = json.loads(query)
+        except json.JSONDecodeError:
+            params = None
+        if not isinstance(params, dict):
+            params = {"label": query.strip()}
+        
+        view = _active_view()
+        author = params.get("author")
+        if view.author:
+            if author and author_key(author) != author_key(view.author):
+                return f"No measurements found for {author}."
+            author = view.author
+        try:
+            # The model may send numbers as strings ("10") or other keys as non-strings
+            filters = {
+                "label": str(params["label"]) if params.get("label") else None,
+                "unit": str(params["unit"]) if params.get("unit") else None,
+                "min_value": float(params["min"]) if params.get("min") is not None else None,
+                "max_value": float(params["max"]) if params.get("max") is not None else None,
+                "author": str(author) if author else None,
+                "date_from": str(params["date_from"]) if params.get("date_from") else None,
+                "date_to": str(params["date_to"]) if params.get("date_to") else None
+            }
+            if params.get("group_by"):
+                groups = self.measurement_index.aggregate(params["group_by"], **filters)
+                if groups.empty:
+                    return "No matching measurements found."
+                result = f"Measurement statistics by {params['group_by']}:\n\n"
+                for row in groups.itertuples(index=False):
+                    key = getattr(row, params["group_by"])
+                    result += f"**{key}** ({row.quantity}): n={row.count}, mean {row.mean:.4g} {row.unit}, range {row.min:.4g}-{row.max:.4g} {row.unit}\n"
+                return result
+            readings = self.measurement_index.query(**filters)
+        except (TypeError, ValueError) as e:
+            return f"Invalid measurement query: {e}"
+        
+        if readings.empty:
+            return "No matching measurements found."
+        
+        result = f"Found {len(readings)} matching measurements:\n\n"
+        for row in readings.head(20).itertuples(index=False):
+            comparator = "" if row.comparator == "=" else row.comparator
+            value = f"{row.value:g}" if math.isnan(row.upper) else f"{row.value:g}-{row.upper:g}"
+            converted = f" (= {row.value_in_unit:.4g} {filters['unit']})" if filters["unit"] else ""
+            label = f"{row.context} / {row.label}" if row.context else row.label
+            result += f"**{row.title}** by {row.author} ({row.date}): {label}: {comparator}{value} {row.unit}{converted}\n"
+        if len(readings) > 20:
+            result += f"... and {len(readings) - 20} more\n"
+        
+        return result
+
+class StreamEventHandler(BaseCallbackHandler):
+    """Forwards LLM tokens and agent tool calls to a queue as stream events"""
+    
+    def __init__(self, events: queue.Queue):
+        self.events = events
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.events.put({"event": "token", "data": token})
+    
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.events.put({"event": "tool_start", "data": {"tool": (serialized or {}).get("name"), "input": input_str}})
+    
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self.events.put({"event": "tool_end", "data": {"tool": kwargs.get("name"), "output_chars": len(str(output))}})
+
 class ScientificLogbookAgent:
-    def __init__(self, model_type: str = "openai"):
+    def __init__(
+        self,
+        model_type: str = "openai",
+        scheduler: Optional[LLMScheduler] = None,
+        stats: Optional[CorpusStats] = None,
+        measurement_index: Optional[MeasurementIndex] = None,
+        entry_index: Optional[EntryIndex] = None
+    ):
         self.model_type = model_type
+        # Long-lived full-text index, updated incrementally as entries change
+        self.search_index = BM25Index()
+        # Offline semantic index over entry sections, persisted as a memory-mapped matrix
+        self.vector_index = VectorIndex()
+        # Completions keyed by model identity + rendered prompt, shared across backends
+        self.response_cache = LLMResponseCache()
+        # Hierarchical summary nodes: keyed by their inputs and kept until evicted by size, not age
+        self.summary_cache = LLMResponseCache(
+            max_entries=4096,
+            ttl_seconds=None,
+            disk_dir=".cache/summaries",
+            max_disk_bytes=256 * 1024 * 1024
+        )
+        self.summarizer = HierarchicalSummarizer(self._summary_node)
+        # Packs ranked entries into per-backend token budgets for prompts and tool output
+        self.context_builder = ContextBuilder()
+        # Author/date/tag secondary indexes behind the user and team tools and filtered views:
+        # the parser's when given (it indexes the same corpus), else maintained by sync_indexes()
+        self.entry_index = entry_index if entry_index is not None else EntryIndex()
+        self._owns_entry_index = entry_index is None
+        # Corpus counters for the team tool and summary statistics: the parser's (kept
+        # current per changed file) when given, else maintained by sync_indexes()
+        self.stats = stats or CorpusStats()
+        self._owns_stats = stats is None
+        # Quantitative readings from Results sections as a pandas table, persisted under .cache;
+        # like stats, shared with the API when given, else maintained by sync_indexes()
+        self.measurement_index = measurement_index if measurement_index is not None else MeasurementIndex()
+        self._owns_measurements = measurement_index is None
+        # Coalesces concurrent cache misses for the same prompt into one backend call
+        self.single_flight = SingleFlight()
+        # Admission control in front of the backends; outlives switch_model() so
+        # calls already running on the old backend release the slot they took there
+        self.scheduler = scheduler or LLMScheduler(limits=DEFAULT_BACKEND_LIMITS)
+        # Shared, versioned corpus the tools read through per-request views
+        self.corpus = CorpusSnapshot(0, [])
+        self._corpus_lock = threading.Lock()
+        # Parser corpus version the indexes were last synced to; None if unknown
+        self._synced_version: Optional[str] = None
+        # Request threads and the parser's change listener sync concurrently
+        self._sync_lock = threading.Lock()
+        self.tools = self._create_tools()
+        self._executor = None
+        self._llm = None
+        self._llm_lock = threading.Lock()
         self.switch_model(model_type)
     
+    async def aclose(self):
+        """Release pooled HTTP connections held by the current backend, and the vector store slot"""
+        if isinstance(self._llm, LMStudioChat):
+            await self._llm.aclose()
+        self.vector_index.close()
+    
     def switch_model(self, model_type: str):
-        """Switch between OpenAI and local LM Studio model"""
-        self.model_type = model_type
+        """Switch between OpenAI and local LM Studio model
         
+        The backend client is built on first use, so switching (and starting
+        up) does not load a provider SDK that may never be called.
+        """
+        with self._llm_lock:
+            self.model_type = model_type
+            self._llm = None
+            self.context_builder.backend = model_type
+            # The executor is bound to the LLM; rebuild it lazily for the new backend
+            self._executor = None
+    
+    @property
+    def llm(self) -> Any:
+        """LLM client for the current backend, built on first use"""
+        llm = self._llm
+        if llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = self._build_llm(self.model_type)
+                llm = self._llm
+        return llm
+    
+    @staticmethod
+    def _build_llm(model_type: str) -> Any:
         if model_type == "local":
-            self.llm = LMStudioChat(
+            return LMStudioChat(
                 base_url="http://127.0.0.1:1234",
                 model="gemma-3-12b",
-                temperature=0.1
-            )
-        else:  # default to openai
-            self.llm = ChatOpenAI(
-                model="gpt-4o-mini",  # Updated to a more recent model
                 temperature=0.1,
-                openai_api_key=os.getenv("OPENAI_API_KEY")
+                streaming=True
             )
+        # default to openai
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model="gpt-4o-mini",  # Updated to a more recent model
+            temperature=0.1,
+            streaming=True,
+            openai_api_key=os.getenv("OPENAI_API_KEY")
+        )
+    
+    def _prompt_cache_key(self, prompt: PromptTemplate, inputs: Dict[str, Any]) -> str:
+        """Cache key for a prompt rendered against the current backend"""
+        model_name = getattr(self.llm, 'model_name', None) or getattr(self.llm, 'model', '')
+        temperature = getattr(self.llm, 'temperature', None)
+        return LLMResponseCache.make_key(self.model_type, str(model_name), temperature, prompt.format(**inputs))
+    
+    def _store_response(self, key: str, response: str, cache: Optional[LLMResponseCache] = None):
+        if not response.startswith(LMSTUDIO_ERROR_PREFIX):
+            (cache or self.response_cache).set(key, response)
+    
+    def _complete(self, prompt: PromptTemplate, inputs: Dict[str, Any], priority: Optional[Priority], cache: Optional[LLMResponseCache] = None) -> str:
+        """Run prompt | llm, serving identical prompts from the response cache
+        
+        Only the call that actually reaches the backend takes a scheduler slot;
+        cache hits and coalesced duplicates never queue. Pass ``priority=None``
+        when the caller already holds a slot for the current backend; such
+        calls are not coalesced, since waiting on an in-flight duplicate whose
+        leader is queued for that very slot would deadlock.
+        ``cache`` overrides the default response cache.
+        """
+        cache = cache or self.response_cache
+        key = self._prompt_cache_key(prompt, inputs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        backend, llm = self.model_type, self.llm
+        
+        if priority is None:
+            response = (prompt | llm | StrOutputParser()).invoke(inputs)
+            self._store_response(key, response, cache)
+            return response
+        
+        def call() -> str:
+            with self.scheduler.slot(backend, priority):
+                response = (prompt | llm | StrOutputParser()).invoke(inputs)
+            self._store_response(key, response, cache)
+            return response
+        
+        # Identical prompts already in flight share that call instead of issuing another
+        return self.single_flight.do(key, call)
+    
+    async def _acomplete(self, prompt: PromptTemplate, inputs: Dict[str, Any], priority: Priority, cache: Optional[LLMResponseCache] = None) -> str:
+        """Async version of _complete()"""
+        cache = cache or self.response_cache
+        key = self._prompt_cache_key(prompt, inputs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        backend, llm = self.model_type, self.llm
+        
+        async def call() -> str:
+            async with self.scheduler.aslot(backend, priority):
+                response = await (prompt | llm | StrOutputParser()).ainvoke(inputs)
+            self._store_response(key, response, cache)
+            return response
         
-    def _create_tools(self, entries: List[Dict[str, Any]]) -> List[BaseTool]:
-        """Create tools with current entries"""
+        return await self.single_flight.ado(key, call)
+    
+    def _stream_complete(self, prompt: PromptTemplate, inputs: Dict[str, Any], priority: Priority) -> Iterator[str]:
+        """Streaming version of _complete(); a cache hit arrives as a single chunk"""
+        key = self._prompt_cache_key(prompt, inputs)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        backend, llm = self.model_type, self.llm
+        parts = []
+        with self.scheduler.slot(backend, priority):
+            for token in (prompt | llm | StrOutputParser()).stream(inputs):
+                parts.append(token)
+                yield token
+        self._store_response(key, "".join(parts))
+    
+    def sync_indexes(self, entries: List[Dict[str, Any]], version: Optional[str] = None):
+        """Update the shared corpus snapshot and search indexes; only changed entries are reindexed
+        
+        ``version`` is the parser's corpus version of ``entries``; queries
+        carrying the same version then skip the sync altogether.
+        """
+        with self._sync_lock:
+            self._publish_corpus(entries)
+            if self._owns_entry_index:
+                self.entry_index.sync(entries)
+            if self._owns_stats:
+                self.stats.sync(entries)
+            self.search_index.sync(entries)
+            self.vector_index.sync(entries)
+            if self._owns_measurements:
+                self.measurement_index.sync(entries)
+            self._synced_version = version
+    
+    def _publish_corpus(self, entries: List[Dict[str, Any]]) -> CorpusSnapshot:
+        """Make entries the shared corpus snapshot, bumping the version only if it changed"""
+        with self._corpus_lock:
+            current = self.corpus
+            if len(current.entries) != len(entries) or any(a is not b for a, b in zip(current.entries, entries)):
+                self.corpus = CorpusSnapshot(current.version + 1, entries)
+            return self.corpus
+    
+    def _create_tools(self) -> List[BaseTool]:
+        """Create the long-lived tools; they read the per-request corpus view at call time"""
         return [
-            LogbookQueryTool(entries),
-            UserActivityTool(entries),
-            TeamSummaryTool(entries)
+            LogbookQueryTool(self.search_index, self.context_builder),
+            LogbookSemanticSearchTool(self.vector_index),
+            UserActivityTool(self.entry_index),
+            TeamSummaryTool(self.entry_index, self.stats),
+            MeasurementQueryTool(self.measurement_index)
         ]
     
-    def query(self, query: str, entries: List[Dict[str, Any]], user_filter: Optional[str] = None) -> str:
-        """Answer a query about the logbook entries"""
-        try:
-            # Filter entries by user if specified
-            if user_filter:
-                entries = [entry for entry in entries if entry['author'].lower() == user_filter.lower()]
-            
-            # Create tools with current entries
-            tools = self._create_tools(entries)
-            
-            # Initialize agent
-            agent = initialize_agent(
-                tools,
+    def _get_executor(self) -> Any:
+        """Agent executor for the current backend, built once per switch_model()"""
+        executor = self._executor
+        if executor is None:
+            from langchain.agents import initialize_agent, AgentType
+            executor = initialize_agent(
+                self.tools,
                 self.llm,
                 agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=True,
+                verbose=False,
                 handle_parsing_errors=True
             )
+            self._executor = executor
+        return executor
+    
+    def _prepare_query(
+        self,
+        query: str,
+        entries: List[Dict[str, Any]],
+        user_filter: Optional[str],
+        version: Optional[str] = None
+    ) -> Tuple[CorpusView, str]:
+        """Publish the corpus and build the request's view and contextualized query"""
+        # Keep the search indexes and shared snapshot in line with the full corpus, unless
+        # they already are (the parser's change listener normally keeps them current)
+        if version is None or version != self._synced_version:
+            self.sync_indexes(entries, version)
+        
+        # Filter entries by user if specified, through the author index rather than a scan
+        view = CorpusView(self.corpus, author=user_filter, index=self.entry_index)
+        
+        # Add context to the query
+        context = f"You are helping analyze scientific logbook entries. "
+        context += f"There are {len(view)} entries available. "
+        if user_filter:
+            context += f"Results are filtered for user: {user_filter}. "
+        context += f"User query: {query}"
+        return view, context
+    
+    def query(
+        self,
+        query: str,
+        entries: List[Dict[str, Any]],
+        user_filter: Optional[str] = None,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+        version: Optional[str] = None
+    ) -> str:
+        """Answer a query about the logbook entries
+        
+        ``version`` is the parser's corpus version of ``entries``, if known.
+        """
+        try:
+            view, context = self._prepare_query(query, entries, user_filter, version)
+            token = current_view.set(view)
+            try:
+                # The whole agent run (all its LLM steps) holds one interactive slot
+                with self.scheduler.slot(self.model_type, Priority.INTERACTIVE):
+                    response = self._get_executor().run(context, callbacks=callbacks)
+            finally:
+                current_view.reset(token)
+            return response
             
-            # Add context to the query
-            context = f"You are helping analyze scientific logbook entries. "
-            context += f"There are {len(entries)} entries available. "
-            if user_filter:
-                context += f"Results are filtered for user: {user_filter}. "
-            context += f"User query: {query}"
-            
-            # Get response from agent
-            response = agent.run(context)
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            return f"Error processing query: {str(e)}"
+    
+    async def aquery(self, query: str, entries: List[Dict[str, Any]], user_filter: Optional[str] = None, version: Optional[str] = None) -> str:
+        """Async version of query(); index updates run in a worker thread"""
+        try:
+            view, context = await asyncio.to_thread(self._prepare_query, query, entries, user_filter, version)
+            token = current_view.set(view)
+            try:
+                async with self.scheduler.aslot(self.model_type, Priority.INTERACTIVE):
+                    response = await self._get_executor().arun(context)
+            finally:
+                current_view.reset(token)
             return response
             
+        except SchedulerRejected:
+            raise
         except Exception as e:
             return f"Error processing query: {str(e)}"
     
-    def generate_summary(self, entries: List[Dict[str, Any]]) -> str:
-        """Generate a comprehensive summary of scientific activities"""
-        if not entries:
-            return "No logbook entries available."
+    def stream_query(self, query: str, entries: List[Dict[str, Any]], user_filter: Optional[str] = None, version: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream agent steps and tokens while answering a query
         
-        # Prepare data for summary
-        total_entries = len(entries)
-        authors = list(set([entry['author'] for entry in entries]))
-        recent_entries = [entry for entry in entries if self._is_recent(entry['date'])]
+        Yields "token", "tool_start" and "tool_end" events as they happen, then
+        an "answer" event with the final response and a closing "done" event.
+        """
+        events: queue.Queue = queue.Queue()
+        handler = StreamEventHandler(events)
         
-        # Extract key metrics
-        total_experiments = sum(len(entry.get('experiments', [])) for entry in entries)
-        total_results = sum(len(entry.get('results', [])) for entry in entries)
+        def run():
+            try:
+                events.put({"event": "answer", "data": self.query(query, entries, user_filter, callbacks=[handler], version=version)})
+            except SchedulerRejected as e:
+                events.put({"event": "error", "data": str(e)})
+            finally:
+                events.put(None)
+        
+        threading.Thread(target=run, name="agent-stream", daemon=True).start()
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield event
+        yield {"event": "done", "data": ""}
+    
+    def _summary_prompt(self, entries: List[Dict[str, Any]], user_filter: Optional[str] = None) -> Tuple[PromptTemplate, Dict[str, Any]]:
+        """Build the summary prompt template and its input variables
+        
+        Statistics cover the whole corpus (or the user's entries) when the
+        agent shares the parser's counters; otherwise they are counted over
+        the given entries.
+        """
+        if self._owns_stats:
+            stats = CorpusStats()
+            stats.sync(entries)
+        else:
+            stats = self.stats
+        overview = stats.overview(author=user_filter)
         
         # Use LLM to generate narrative summary
         prompt = PromptTemplate(
@@ -273,9 +779,9 @@ class ScientificLogbookAgent:
             Generate a comprehensive summary of scientific activities based on the following logbook data:
 
             Statistics:
-            - Total entries analyzed: {total_entries}
+            - Total entries: {total_entries}
             - Active researchers: {authors}
-            - Latest entries (up to 5 most recent): {recent_entries}
+            - Entries from the last 30 days: {recent_entries}
             - Total experiments: {total_experiments}
             - Total results: {total_results}
 
@@ -293,49 +799,93 @@ class ScientificLogbookAgent:
             """
         )
         
-        # Prepare sample entries for context (limited to available entries)
+        # Sample entries for context: newest first, as many sections as fit the backend's summary budget
+        ranked = [(1.0 / (1 + i), entry) for i, entry in enumerate(entries)]
         sample_entries = []
-        for entry in entries[:5]:  # Use the entries passed in (already limited to 5)
+        for entry, sections in self.context_builder.pack(ranked, self.context_builder.budget("summary")):
             sample_entries.append({
                 "author": entry['author'],
                 "date": entry['date'],
                 "title": entry['title'],
-                "summary": entry['content'][:200] + "..."
+                "summary": "\n".join(f"{section}: {text}" for section, text in sections)
             })
         
-        stats = {
-            "total_entries": total_entries,
-            "authors": len(authors),
-            "recent_entries": len(recent_entries),
-            "total_experiments": total_experiments,
-            "total_results": total_results
+        return prompt, {
+            "entries": json.dumps(sample_entries, indent=2),
+            "total_entries": overview["total_entries"],
+            "authors": overview["authors"],
+            "recent_entries": overview["recent_entries"],
+            "total_experiments": overview["total_experiments"],
+            "total_results": overview["total_results"]
         }
+    
+    def generate_summary(self, entries: List[Dict[str, Any]], user_filter: Optional[str] = None) -> str:
+        """Generate a comprehensive summary of scientific activities"""
+        if not entries:
+            return "No logbook entries available."
         
+        prompt, inputs = self._summary_prompt(entries, user_filter)
         try:
-            chain = prompt | self.llm | StrOutputParser()
-            summary = chain.invoke({
-                "entries": json.dumps(sample_entries, indent=2),
-                "total_entries": stats["total_entries"],
-                "authors": stats["authors"],
-                "recent_entries": stats["recent_entries"],
-                "total_experiments": stats["total_experiments"],
-                "total_results": stats["total_results"]
-            })
+            summary = self._complete(prompt, inputs, Priority.SUMMARY)
             return summary
+        except SchedulerRejected:
+            raise
         except Exception as e:
             return f"Error generating summary: {str(e)}"
     
-    def _is_recent(self, date_str: str, days: int = 30) -> bool:
-        """Check if a date is within the last N days"""
+    async def agenerate_summary(self, entries: List[Dict[str, Any]], user_filter: Optional[str] = None) -> str:
+        """Async version of generate_summary()"""
+        if not entries:
+            return "No logbook entries available."
+        
+        prompt, inputs = self._summary_prompt(entries, user_filter)
         try:
-            entry_date = datetime.strptime(date_str, '%Y-%m-%d')
-            return (datetime.now() - entry_date).days <= days
-        except:
-            return False
+            return await self._acomplete(prompt, inputs, Priority.SUMMARY)
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            return f"Error generating summary: {str(e)}"
     
-    def refine_entry(self, author: str, title: str, rough_description: str, tags: List[str]) -> str:
-        """Refine a rough description into a well-formatted scientific logbook entry"""
+    def stream_summary(self, entries: List[Dict[str, Any]], user_filter: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream summary tokens as {"event": "token", "data": text} events, then a "done" event"""
+        if not entries:
+            yield {"event": "token", "data": "No logbook entries available."}
+            yield {"event": "done", "data": ""}
+            return
+        
+        prompt, inputs = self._summary_prompt(entries, user_filter)
+        try:
+            for token in self._stream_complete(prompt, inputs, Priority.SUMMARY):
+                yield {"event": "token", "data": token}
+        except Exception as e:
+            yield {"event": "error", "data": f"Error generating summary: {str(e)}"}
+        yield {"event": "done", "data": ""}
+    
+    async def _summary_node(self, prompt: PromptTemplate, inputs: Dict[str, Any]) -> str:
+        """One node of the hierarchical summary, cached by its rendered inputs"""
+        response = await self._acomplete(prompt, inputs, Priority.SUMMARY, cache=self.summary_cache)
+        if response.startswith(LMSTUDIO_ERROR_PREFIX):
+            # Never let a backend error become the input of a cached parent node
+            raise RuntimeError(response)
+        return response
+    
+    async def asummarize_corpus(self, entries: List[Dict[str, Any]]) -> str:
+        """Summarize every given entry via per-entry, per-author/week and team levels
         
+        Only nodes whose inputs changed since the last run call the LLM.
+        """
+        if not entries:
+            return "No logbook entries available."
+        
+        try:
+            return await self.summarizer.summarize(entries)
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            return f"Error generating summary: {str(e)}"
+    
+    def _refine_prompt(self, author: str, title: str, rough_description: str, tags: List[str]) -> Tuple[PromptTemplate, Dict[str, Any]]:
+        """Build the entry refinement prompt template and its input variables"""
         prompt = PromptTemplate(
             input_variables=["author", "title", "rough_description", "tags"],
             template="""
@@ -375,14 +925,71 @@ class ScientificLogbookAgent:
             """
         )
         
+        return prompt, {
+            "author": author,
+            "title": title,
+            "rough_description": rough_description,
+            "tags": ", ".join(tags) if tags else "None"
+        }
+    
+    def refine_entry(self, author: str, title: str, rough_description: str, tags: List[str]) -> str:
+        """Refine a rough description into a well-formatted scientific logbook entry"""
+        prompt, inputs = self._refine_prompt(author, title, rough_description, tags)
+        try:
+            refined_content = self._complete(prompt, inputs, Priority.REFINE)
+            return refined_content.strip()
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            return f"Error refining entry: {str(e)}"
+    
+    def refine_batch(self, drafts: List[Dict[str, Any]]) -> List[Any]:
+        """Refine several drafts in one scheduler session
+        
+        Each draft has author, title, rough_description and tags. The batch
+        queues for a backend slot once and then runs its refinements back to
+        back over the same pooled connection. Returns, per draft, the refined
+        content or the exception that failed it (backend error responses
+        included), so callers can retry individual drafts.
+        """
+        outcomes: List[Any] = []
+        with self.scheduler.slot(self.model_type, Priority.REFINE):
+            for draft in drafts:
+                prompt, inputs = self._refine_prompt(draft['author'], draft['title'], draft['rough_description'], draft['tags'])
+                try:
+                    refined_content = self._complete(prompt, inputs, None).strip()
+                    if not refined_content or refined_content.startswith(LMSTUDIO_ERROR_PREFIX):
+                        raise RuntimeError(refined_content or "Empty response from model")
+                    outcomes.append(refined_content)
+                except Exception as e:
+                    outcomes.append(e)
+        return outcomes
+    
+    async def arefine_entry(self, author: str, title: str, rough_description: str, tags: List[str]) -> str:
+        """Async version of refine_entry()"""
+        prompt, inputs = self._refine_prompt(author, title, rough_description, tags)
         try:
-            chain = prompt | self.llm | StrOutputParser()
-            refined_content = chain.invoke({
-                "author": author,
-                "title": title,
-                "rough_description": rough_description,
-                "tags": ", ".join(tags) if tags else "None"
-            })
+            refined_content = await self._acomplete(prompt, inputs, Priority.REFINE)
             return refined_content.strip()
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            return f"Error refining entry: {str(e)}"
+    
+    def stream_refine_entry(self, author: str, title: str, rough_description: str, tags: List[str]) -> Iterator[Dict[str, Any]]:
+        """Stream refinement tokens, then a "done" event carrying the full stripped content"""
+        prompt, inputs = self._refine_prompt(author, title, rough_description, tags)
+        parts = []
+        try:
+            for token in self._stream_complete(prompt, inputs, Priority.REFINE):
+                parts.append(token)
+                yield {"event": "token", "data": token}
+            refined_content = "".join(parts).strip()
+        except SchedulerRejected as e:
+            # Nothing was generated; end without a "done" event so the draft is not saved
+            yield {"event": "error", "data": str(e)}
+            return
         except Exception as e:
-            return f"Error refining entry: {str(e)}"
\ No newline at end of file
+            refined_content = f"Error refining entry: {str(e)}"
+            yield {"event": "error", "data": refined_content}
+        yield {"event": "done", "data": refined_content}
\ No newline at end of file
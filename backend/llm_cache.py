@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+class LLMResponseCache:
+    """Content-addressed cache for LLM completions
+
+    Keys hash the model identity (backend type, model name, temperature) and
+    the fully rendered prompt, so any change to the inputs is a different key.
+    Lookups hit an in-memory LRU first and then, if ``disk_dir`` is set, an
+    on-disk tier of one JSON file per key that is trimmed oldest-first once it
+    exceeds ``max_disk_bytes``. Both tiers honour ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = 24 * 3600,
+        disk_dir: Optional[str] = ".cache/llm",
+        max_disk_bytes: int = 64 * 1024 * 1024
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        # key -> (created_at, response), most recently used last
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._disk_bytes = self._scan_disk_usage()
+
+    @staticmethod
+    def make_key(model_type: str, model_name: str, temperature: float, prompt: str) -> str:
+        """Stable key for a completion request"""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        identity = json.dumps([model_type, model_name, temperature, prompt_hash])
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None"""
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if not self._expired(item[0]):
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return item[1]
+                del self._memory[key]
+
+        item = self._read_disk(key)
+        with self._lock:
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+            self._remember(key, item)
+            return item[1]
+
+    def set(self, key: str, response: str):
+        """Store a response in both tiers"""
+        item = (time.time(), response)
+        with self._lock:
+            self._counters["stores"] += 1
+            self._remember(key, item)
+        self._write_disk(key, item)
+
+    def _remember(self, key: str, item: Tuple[float, str]):
+        """Insert into the memory LRU (caller holds the lock)"""
+        self._memory[key] = item
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if self._expired(data['created_at']):
+            self._remove_disk_file(path)
+            return None
+        # Touch the file so size-based trimming evicts least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data['created_at'], data['response']
+
+    def _write_disk(self, key: str, item: Tuple[float, str]):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created_at': item[0], 'response': item[1]}, f)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Error writing LLM cache entry {path}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += size - old_size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._trim_disk()
+
+    def _remove_disk_file(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+
+    def _disk_files(self):
+        """(mtime, size, path) for every cache file"""
+        files = []
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return files
+        for shard in os.scandir(self.disk_dir):
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                if item.name.endswith('.json'):
+                    st = item.stat()
+                    files.append((st.st_mtime, st.st_size, item.path))
+        return files
+
+    def _scan_disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._disk_files())
+
+    def _trim_disk(self):
+        """Delete least recently used files until the disk tier is back under 90% of its budget"""
+        target = self.max_disk_bytes * 0.9
+        for _, _, path in sorted(self._disk_files()):
+            with self._lock:
+                if self._disk_bytes <= target:
+                    return
+            self._remove_disk_file(path)
+            with self._lock:
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for _, _, path in self._disk_files():
+            self._remove_disk_file(path)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from enum import IntEnum
+from typing import Callable, Dict, Iterator, AsyncIterator, List, Optional
+
+# Concurrent calls admitted per backend; LM Studio serves one generation at a time
+DEFAULT_BACKEND_LIMITS = {"openai": 4, "local": 1}
+
+class Priority(IntEnum):
+    """Request classes, served lowest value first"""
+    INTERACTIVE = 0  # /query
+    REFINE = 1       # /create-entry
+    SUMMARY = 2      # /summary
+
+class SchedulerRejected(Exception):
+    """Raised when a request cannot be admitted to an LLM backend
+
+    ``status_code`` is 429 when the backend's queue is full and 503 when the
+    request waited longer than the scheduler's max_wait.
+    """
+
+    def __init__(self, backend: str, reason: str, status_code: int, retry_after: int = 5):
+        super().__init__(f"LLM backend '{backend}' is busy: {reason}")
+        self.backend = backend
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "wake", "granted", "cancelled", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class _Backend:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.queued = 0
+        self.heap: List[_Waiter] = []
+        self.counters = {"admitted": 0, "queued_total": 0, "rejected": 0, "timed_out": 0}
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+class LLMScheduler:
+    """Admission control and priority queueing in front of LLM backends
+
+    Each backend (e.g. "openai", "local") has its own concurrency limit. When
+    all slots are taken, callers queue by Priority (FIFO within a class); the
+    queue is bounded so overload is rejected immediately with a 429 instead of
+    piling up into timeouts. Sync callers (threads) and async callers share
+    the same slots and queue.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = 2,
+        max_queue: int = 32,
+        max_wait: float = 30.0
+    ):
+        self.default_limit = default_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._backends: Dict[str, _Backend] = {}
+        for backend, limit in (limits or {}).items():
+            self._backends[backend] = _Backend(limit)
+
+    def _state(self, backend: str) -> _Backend:
+        state = self._backends.get(backend)
+        if state is None:
+            state = self._backends[backend] = _Backend(self.default_limit)
+        return state
+
+    def set_limit(self, backend: str, limit: int):
+        """Change a backend's concurrency limit; queued requests are admitted if it grew"""
+        with self._lock:
+            state = self._state(backend)
+            state.limit = limit
+            self._dispatch(state)
+
+    def _dispatch(self, state: _Backend):
+        """Hand free slots to the best queued waiters (caller holds the lock)"""
+        while state.active < state.limit and state.heap:
+            waiter = heapq.heappop(state.heap)
+            if waiter.cancelled:
+                continue
+            waiter.granted = True
+            state.queued -= 1
+            state.active += 1
+            self._record_admission(state, waiter.enqueued_at)
+            waiter.wake()
+
+    def _record_admission(self, state: _Backend, enqueued_at: float):
+        waited = time.monotonic() - enqueued_at
+        state.counters["admitted"] += 1
+        state.wait_seconds_total += waited
+        state.wait_seconds_max = max(state.wait_seconds_max, waited)
+
+    def _try_enter(self, backend: str, priority: int, wake: Callable[[], None]) -> Optional[_Waiter]:
+        """Take a slot immediately (returns None) or enqueue a waiter; raises when the queue is full"""
+        with self._lock:
+            state = self._state(backend)
+            if state.active < state.limit and state.queued == 0:
+                state.active += 1
+                self._record_admission(state, time.monotonic())
+                return None
+            if state.queued >= self.max_queue:
+                state.counters["rejected"] += 1
+                raise SchedulerRejected(backend, f"{state.queued} requests already queued", 429)
+            waiter = _Waiter(int(priority), next(self._seq), wake)
+            heapq.heappush(state.heap, waiter)
+            state.queued += 1
+            state.counters["queued_total"] += 1
+            return waiter
+
+    def _abandon(self, backend: str, waiter: _Waiter) -> bool:
+        """Withdraw a waiter; returns True if it had already been granted a slot"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            state = self._state(backend)
+            state.queued -= 1
+            return False
+
+    def release(self, backend: str):
+        with self._lock:
+            state = self._state(backend)
+            state.active -= 1
+            self._dispatch(state)
+
+    @contextmanager
+    def slot(self, backend: str, priority: Priority) -> Iterator[None]:
+        """Hold one of the backend's slots for the duration of the block (blocking threads)"""
+        event = threading.Event()
+        waiter = self._try_enter(backend, priority, event.set)
+        if waiter is not None and not event.wait(self.max_wait):
+            if not self._abandon(backend, waiter):
+                with self._lock:
+                    self._state(backend).counters["timed_out"] += 1
+                raise SchedulerRejected(backend, f"no slot within {self.max_wait:.0f}s", 503)
+        try:
+            yield
+        finally:
+            self.release(backend)
+
+    @asynccontextmanager
+    async def aslot(self, backend: str, priority: Priority) -> AsyncIterator[None]:
+        """Async version of slot(); waiting does not block the event loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._try_enter(backend, priority, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(future, self.max_wait)
+            except asyncio.TimeoutError:
+                if not self._abandon(backend, waiter):
+                    with self._lock:
+                        self._state(backend).counters["timed_out"] += 1
+                    raise SchedulerRejected(backend, f"no slot within {self.max_wait:.0f}s", 503)
+            except asyncio.CancelledError:
+                # Client went away while queued: give back the slot if it was granted meanwhile
+                if self._abandon(backend, waiter):
+                    self.release(backend)
+                raise
+        try:
+            yield
+        finally:
+            self.release(backend)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-backend slot usage, queue depth and queue-wait metrics"""
+        with self._lock:
+            result = {}
+            for backend, state in self._backends.items():
+                admitted = state.counters["admitted"]
+                result[backend] = {
+                    "limit": state.limit,
+                    "active": state.active,
+                    "queued": state.queued,
+                    **state.counters,
+                    "avg_wait_seconds": state.wait_seconds_total / admitted if admitted else 0.0,
+                    "max_wait_seconds": state.wait_seconds_max,
+                }
+            return result
@@ -0,0 +1,165 @@
+import mmap
+import os
+import sys
+from collections.abc import Mapping
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+# Mapping keys every entry exposes, in the order the old dict entries had them
+ENTRY_KEYS = ("file_path", "author", "date", "title", "content", "tags", "experiments", "results", "observations")
+
+# Section kinds, in the order their texts are listed
+EXPERIMENT, RESULT, OBSERVATION = 0, 1, 2
+
+# (kind, heading remainder, byte start, byte end) of a section body in the file
+SectionRef = Tuple[int, str, int, int]
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+class LogbookEntry(Mapping):
+    """Compact, read-only parsed logbook entry
+
+    Only metadata lives in memory: author, date and tags are interned so
+    thousands of entries share one copy of each, and the body and every
+    Experiment/Results/Observations section are byte offsets into the
+    markdown file. ``content`` and section texts are read through mmap
+    when accessed and are not kept.
+
+    Entries behave like the dicts the parser used to return (``entry['x']``,
+    ``entry.get``, iteration over keys), except that equality is identity.
+    If the file changed since it was parsed (the watcher will replace the
+    entry shortly), lazy reads re-parse the current file instead of using
+    stale offsets.
+    """
+
+    __slots__ = (
+        "file_path", "author", "date", "title", "_tags",
+        "mtime_ns", "size", "body_start", "body_end", "_sections"
+    )
+
+    def __init__(
+        self,
+        file_path: str,
+        author: Any,
+        date: str,
+        title: Any,
+        tags: List[Any],
+        mtime_ns: int,
+        size: int,
+        body_start: int,
+        body_end: int,
+        sections: List[SectionRef]
+    ):
+        self.file_path = file_path
+        self.author = _intern(author)
+        self.date = sys.intern(date)
+        self.title = title
+        self._tags = tuple(_intern(tag) for tag in tags)
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.body_start = body_start
+        self.body_end = body_end
+        self._sections = tuple((kind, sys.intern(prefix), start, end) for kind, prefix, start, end in sections)
+
+    def __reduce__(self):
+        # Rebuild through __init__ so values are interned in the receiving process
+        return (LogbookEntry, (
+            self.file_path, self.author, self.date, self.title, list(self._tags),
+            self.mtime_ns, self.size, self.body_start, self.body_end, list(self._sections)
+        ))
+
+    # Mapping interface
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ENTRY_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ENTRY_KEYS)
+
+    def __len__(self) -> int:
+        return len(ENTRY_KEYS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in ENTRY_KEYS
+
+    def __eq__(self, other: object) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __repr__(self) -> str:
+        return f"LogbookEntry({self.file_path!r}, author={self.author!r}, date={self.date!r}, title={self.title!r})"
+
+    # Lazily loaded fields
+
+    @property
+    def tags(self) -> List[Any]:
+        return list(self._tags)
+
+    @property
+    def content(self) -> str:
+        data = self._read([(self.body_start, self.body_end)])
+        if data is None:
+            return self._reparse().content
+        return data[0]
+
+    @property
+    def experiments(self) -> List[Dict[str, str]]:
+        return [{"id": f"exp_{i+1}", "description": text} for i, text in enumerate(self._section_texts(EXPERIMENT))]
+
+    @property
+    def results(self) -> List[Dict[str, str]]:
+        return [{"id": f"result_{i+1}", "description": text} for i, text in enumerate(self._section_texts(RESULT))]
+
+    @property
+    def observations(self) -> List[str]:
+        return self._section_texts(OBSERVATION)
+
+    def section_counts(self) -> Tuple[int, int, int]:
+        """Number of experiment, result and observation sections, without reading the file"""
+        counts = [0, 0, 0]
+        for kind, _, _, _ in self._sections:
+            counts[kind] += 1
+        return counts[EXPERIMENT], counts[RESULT], counts[OBSERVATION]
+
+    def section_refs(self) -> List[SectionRef]:
+        return list(self._sections)
+
+    def _section_texts(self, kind: int) -> List[str]:
+        refs = [ref for ref in self._sections if ref[0] == kind]
+        if not refs:
+            return []
+        bodies = self._read([(start, end) for _, _, start, end in refs])
+        if bodies is None:
+            return self._reparse()._section_texts(kind)
+        texts = [f"{prefix}\n{body}".strip() for (_, prefix, _, _), body in zip(refs, bodies)]
+        return [text for text in texts if text]
+
+    def _read(self, spans: List[Tuple[int, int]]) -> Optional[List[str]]:
+        """Decode byte spans of the file, or None if it no longer matches this entry"""
+        try:
+            with open(self.file_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_mtime_ns != self.mtime_ns or st.st_size != self.size:
+                    return None
+                if st.st_size == 0:
+                    return ["" for _ in spans]
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    # Universal newlines, as the parser's text-mode reads used to give
+                    return [
+                        data[start:end].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                        for start, end in spans
+                    ]
+        except FileNotFoundError:
+            return ["" for _ in spans]
+
+    def _reparse(self) -> "LogbookEntry":
+        # Imported here: the parser module imports this one
+        from logbook_parser import LogbookParser
+        try:
+            return LogbookParser(snapshot_path=None).parse_markdown_entry(self.file_path)
+        except FileNotFoundError:
+            return LogbookEntry(self.file_path, self.author, self.date, self.title, [], 0, 0, 0, 0, [])
@@ -1,30 +1,192 @@
 import os
 import re
 import glob
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable, Callable, Container
 import yaml
 
+from entry_snapshot import EntrySnapshot
+from entry_index import EntryIndex
+from corpus_stats import CorpusStats
+from logbook_entry import LogbookEntry, EXPERIMENT, RESULT, OBSERVATION
+
+# ATX heading: 1-6 '#' followed by whitespace; an optional closing '#' run is dropped
+HEADING_PATTERN = re.compile(r'(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+FENCE_PATTERN = re.compile(r'[ \t]*(```|~~~)')
+
+# Section headings recognised by the extractors (matched at the start of the heading text)
+EXPERIMENT_HEADING_PATTERN = re.compile(r'(?:experiment\w*|exp|procedures?|methods?)\b(?:\s+\d+)?:?\s*', re.IGNORECASE)
+RESULT_HEADING_PATTERN = re.compile(r'(?:results?|findings?|outcomes?)\b(?:\s+\d+)?:?\s*', re.IGNORECASE)
+OBSERVATION_HEADING_PATTERN = re.compile(r'(?:observations?|notes?|remarks?)\b(?:\s+\d+)?:?\s*', re.IGNORECASE)
+TAG_HEADING_PATTERN = re.compile(r'(?:tags?|keywords?)\s*:?\s*$', re.IGNORECASE)
+
+HASHTAG_PATTERN = re.compile(r'(?<![\w#&])#([A-Za-z]\w*)')
+TAG_LINE_PATTERN = re.compile(r'^[ \t]*(?:tags?|keywords?):[ \t]*(.+)$', re.IGNORECASE | re.MULTILINE)
+TAG_SPLIT_PATTERN = re.compile(r'[,;\s]+')
+
+@dataclass
+class Section:
+    """A markdown heading and the span of its own body text
+    
+    ``start``/``end`` are character offsets into the entry content covering the
+    text between this heading and the next heading of any level. The root
+    section (level 0) holds the text before the first heading.
+    """
+    level: int
+    title: str
+    start: int
+    end: int = 0
+    children: List["Section"] = field(default_factory=list)
+    
+    def body(self, content: str) -> str:
+        return content[self.start:self.end]
+    
+    def walk(self) -> Iterator["Section"]:
+        """Yield this section and all descendants in document order"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+def split_sections(content: str) -> Section:
+    """Split markdown content into a heading tree in a single pass over its lines
+    
+    Lines inside fenced code blocks are never treated as headings.
+    """
+    root = Section(level=0, title="", start=0)
+    stack = [root]
+    current = root
+    in_fence = False
+    pos = 0
+    for line in content.splitlines(keepends=True):
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        elif not in_fence and line.startswith('#'):
+            match = HEADING_PATTERN.match(line.rstrip('\r\n'))
+            if match:
+                current.end = pos
+                level = len(match.group(1))
+                current = Section(level=level, title=match.group(2), start=pos + len(line))
+                while stack[-1].level >= level:
+                    stack.pop()
+                stack[-1].children.append(current)
+                stack.append(current)
+        pos += len(line)
+    current.end = pos
+    return root
+
+# Pool workers are never forked: the server runs threads (watcher, job workers, snapshot
+# timer, request pool) and a forked child could inherit one of their locks held forever
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+def _parse_batch(logbook_dir: str, file_paths: List[str]) -> List[Tuple[str, Optional[LogbookEntry], Optional[str]]]:
+    """Parse a batch of files in a worker process, returning (path, entry, error) triples"""
+    parser = LogbookParser(logbook_dir, snapshot_path=None)
+    results = []
+    for file_path in file_paths:
+        try:
+            results.append((file_path, parser.parse_markdown_entry(file_path), None))
+        except Exception as e:
+            results.append((file_path, None, str(e)))
+    return results
+
+def author_dir_name(author: str) -> str:
+    """Directory name entries by an author are saved under"""
+    return author.lower().replace(' ', '_')
+
 class LogbookParser:
-    def __init__(self, logbook_dir: str = "logbooks"):
+    """Parses the logbook tree and keeps the parsed corpus current and queryable
+    
+    Parsed entries are cached per file by (mtime, size). The persistent tier
+    is the memory-mapped EntrySnapshot, so a restart is warm without
+    reparsing; lookups by author, date range and tag (query_entries) are
+    answered from the in-memory EntryIndex, updated per changed file. There
+    is no SQL store: with every lookup served in-process from the index, a
+    database would only be a second cache to keep in step with the snapshot.
+    """
+    
+    def __init__(
+        self,
+        logbook_dir: str = "logbooks",
+        snapshot_path: Optional[str] = ".cache/entries.snapshot",
+        snapshot_delay: float = 2.0,
+        workers: Optional[int] = None,
+        parallel_threshold: int = 256,
+        batch_size: int = 128
+    ):
         self.logbook_dir = logbook_dir
+        # Process pool settings for cold scans: workers=None uses all cores, 1 disables the pool
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self.batch_size = batch_size
+        # Persistent, memory-mapped copy of the parse cache; None keeps everything in memory
+        self.snapshot_file = EntrySnapshot(snapshot_path) if snapshot_path else None
+        # Seconds a changed corpus may go unsnapshotted, so bursts of edits cost one rewrite
+        self.snapshot_delay = snapshot_delay
+        self._snapshot_timer: Optional[threading.Timer] = None
+        # Serializes snapshot writes, which run outside the cache lock
+        self._snapshot_lock = threading.Lock()
+        # file_path -> {"mtime_ns": int, "size": int, "entry": dict}
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Sorted entry list for the last scan, reused while the tree is unchanged
+        self._entries: Optional[List[Dict[str, Any]]] = None
+        # Hash of every cached file's (path, mtime, size); identical across processes serving the same tree
+        self._version: Optional[str] = None
+        # Author/date/tag lookups over the cached entries, updated per changed file
+        self.index = EntryIndex()
+        # Per-author/tag/day counters over the cached entries, likewise updated per changed file
+        self.stats = CorpusStats()
+        # Guards the cache against concurrent scans (request threads, the file watcher)
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        # Set by LogbookWatcher while it keeps the cache current
+        self.watched = False
+        self._load_cache()
         
-    def parse_markdown_entry(self, file_path: str) -> Dict[str, Any]:
-        """Parse a single markdown logbook entry"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def parse_markdown_entry(self, file_path: str) -> LogbookEntry:
+        """Parse a single markdown logbook entry
         
-        # Extract frontmatter if it exists
+        The returned entry keeps metadata and byte offsets only; content and
+        section texts are read back from the file on demand.
+        """
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+            st = os.fstat(f.fileno())
+        text = raw.decode('utf-8')
+        
+        # Extract frontmatter if it exists; content is text[content_start:content_end]
         frontmatter = {}
-        if content.startswith('---'):
-            parts = content.split('---', 2)
+        content_start, content_end = 0, len(text)
+        if text.startswith('---'):
+            parts = text.split('---', 2)
             if len(parts) >= 3:
                 try:
-                    frontmatter = yaml.safe_load(parts[1])
-                    content = parts[2].strip()
+                    frontmatter = yaml.safe_load(parts[1]) or {}
+                    # Same span as parts[2].strip()
+                    body_start = len(parts[0]) + len(parts[1]) + 6
+                    body = parts[2]
+                    content_end = body_start + len(body.rstrip())
+                    content_start = min(body_start + len(body) - len(body.lstrip()), content_end)
                 except yaml.YAMLError:
                     pass
+        content = text[content_start:content_end]
+        
+        # Character offsets in content -> byte offsets in the file
+        if len(raw) == len(text):
+            to_byte = lambda offset: content_start + offset
+        else:
+            to_byte = lambda offset: len(text[:content_start + offset].encode('utf-8'))
+        
+        # Split the body into its heading tree once; every extractor below reads from it
+        sections = split_sections(content)
         
         # Extract metadata from frontmatter or filename/content
         author = frontmatter.get('author', self._extract_author_from_path(file_path))
@@ -34,25 +196,25 @@ class LogbookParser:
             date = date.strftime('%Y-%m-%d')
         elif not isinstance(date, str):
             date = str(date)
-        title = frontmatter.get('title', self._extract_title_from_content(content))
-        tags = frontmatter.get('tags', self._extract_tags_from_content(content))
-        
-        # Extract experiment details
-        experiments = self._extract_experiments(content)
-        results = self._extract_results(content)
-        observations = self._extract_observations(content)
-        
-        return {
-            "file_path": file_path,
-            "author": author,
-            "date": date,
-            "title": title,
-            "content": content,
-            "tags": tags,
-            "experiments": experiments,
-            "results": results,
-            "observations": observations
-        }
+        title = frontmatter['title'] if 'title' in frontmatter else self._extract_title_from_content(sections, content)
+        tags = frontmatter['tags'] if 'tags' in frontmatter else self._extract_tags_from_content(sections, content)
+        if isinstance(tags, str):
+            tags = [tags]
+        
+        # Locate experiment, result and observation sections
+        section_refs = []
+        for kind, pattern in [
+            (EXPERIMENT, EXPERIMENT_HEADING_PATTERN),
+            (RESULT, RESULT_HEADING_PATTERN),
+            (OBSERVATION, OBSERVATION_HEADING_PATTERN)
+        ]:
+            for prefix, start, end in self._matching_sections(sections, content, pattern):
+                section_refs.append((kind, prefix, to_byte(start), to_byte(end)))
+        
+        return LogbookEntry(
+            file_path, author, date, title, tags or [],
+            st.st_mtime_ns, st.st_size, to_byte(0), to_byte(len(content)), section_refs
+        )
     
     def _extract_author_from_path(self, file_path: str) -> str:
         """Extract author from file path convention"""
@@ -75,136 +237,395 @@ class LogbookParser:
         # Fall back to file modification time
         return datetime.fromtimestamp(os.path.getmtime(file_path)).strftime('%Y-%m-%d')
     
-    def _extract_title_from_content(self, content: str) -> str:
-        """Extract title from first heading or first line"""
-        lines = content.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('# '):
-                return line[2:].strip()
-            elif line and not line.startswith('#'):
-                return line[:50] + "..." if len(line) > 50 else line
+    def _extract_title_from_content(self, sections: "Section", content: str) -> str:
+        """Extract title from first level-1 heading or first line of text"""
+        for section in sections.walk():
+            if section.level == 1:
+                return section.title
+            for line in section.body(content).split('\n'):
+                line = line.strip()
+                if line:
+                    return line[:50] + "..." if len(line) > 50 else line
         return "Untitled Entry"
     
-    def _extract_tags_from_content(self, content: str) -> List[str]:
-        """Extract tags from content (hashtags or tag sections)"""
+    def _extract_tags_from_content(self, sections: "Section", content: str) -> List[str]:
+        """Extract tags from content (hashtags, "Tags:" lines or a Tags section)"""
         tags = []
-        
-        # Find hashtags
-        hashtag_pattern = r'#(\w+)'
-        hashtags = re.findall(hashtag_pattern, content)
-        tags.extend(hashtags)
-        
-        # Find tag sections
-        tag_section_pattern = r'(?:tags?|keywords?):\s*(.+)'
-        tag_matches = re.findall(tag_section_pattern, content, re.IGNORECASE)
-        for match in tag_matches:
-            # Split by comma, semicolon, or space
-            section_tags = re.split(r'[,;\s]+', match.strip())
-            tags.extend([tag.strip() for tag in section_tags if tag.strip()])
-        
+        for section in sections.walk():
+            body = section.body(content)
+            if TAG_HEADING_PATTERN.match(section.title):
+                # A "## Tags" section lists one or more tags per line
+                for line in body.split('\n'):
+                    line = line.strip().lstrip('-*+ ')
+                    tags.extend(tag for tag in TAG_SPLIT_PATTERN.split(line) if tag)
+                continue
+            tags.extend(HASHTAG_PATTERN.findall(body))
+            for match in TAG_LINE_PATTERN.findall(body):
+                # Split by comma, semicolon, or space
+                tags.extend(tag for tag in TAG_SPLIT_PATTERN.split(match.strip()) if tag)
         return list(set(tags))  # Remove duplicates
     
-    def _extract_experiments(self, content: str) -> List[Dict[str, str]]:
-        """Extract experiment descriptions from content"""
-        experiments = []
-        
-        # Look for experiment sections
-        exp_pattern = r'(?:## |### )?(?:experiment|exp|procedure|method)(?:\s+\d+)?:?\s*(.+?)(?=\n##|\n#|$)'
-        matches = re.findall(exp_pattern, content, re.IGNORECASE | re.DOTALL)
+    def _matching_sections(self, sections: "Section", content: str, pattern: re.Pattern) -> List[Tuple[str, int, int]]:
+        """Sections whose heading starts with one of the pattern's keywords
         
-        for i, match in enumerate(matches):
-            experiments.append({
-                "id": f"exp_{i+1}",
-                "description": match.strip()
-            })
-        
-        return experiments
+        Returns (heading remainder, body start, body end) per non-empty match.
+        Any heading text after the keyword (e.g. "Experiment 2: PCR") becomes
+        the first line of the description, followed by the section's own body
+        up to the next heading (see LogbookEntry).
+        """
+        spans = []
+        for section in sections.walk():
+            match = pattern.match(section.title) if section.level else None
+            if match:
+                prefix = section.title[match.end():]
+                if f"{prefix}\n{section.body(content)}".strip():
+                    spans.append((prefix, section.start, section.end))
+        return spans
     
-    def _extract_results(self, content: str) -> List[Dict[str, str]]:
-        """Extract results from content"""
-        results = []
-        
-        # Look for results sections
-        result_pattern = r'(?:## |### )?(?:results?|findings?|outcome)(?:\s+\d+)?:?\s*(.+?)(?=\n##|\n#|$)'
-        matches = re.findall(result_pattern, content, re.IGNORECASE | re.DOTALL)
+    def _load_cache(self):
+        """Warm the parse cache from the entry snapshot, if there is a usable one"""
+        snapshot = self.snapshot_file.load(self.logbook_dir) if self.snapshot_file is not None else None
+        if snapshot is not None:
+            self._cache = snapshot
+        for cached in self._cache.values():
+            self.index.add(cached['entry'])
+            self.stats.add(cached['entry'])
+    
+    @staticmethod
+    def _file_signature(file_path: str) -> Tuple[int, int]:
+        """Cheap change detector for a file: (mtime in ns, size in bytes)"""
+        st = os.stat(file_path)
+        return st.st_mtime_ns, st.st_size
+    
+    def _parse_files(self, file_paths: List[str]) -> List[Tuple[str, Optional[LogbookEntry], Optional[str]]]:
+        """Parse files into (path, entry, error) triples in input order
         
-        for i, match in enumerate(matches):
-            results.append({
-                "id": f"result_{i+1}",
-                "description": match.strip()
-            })
+        Large batches (cold starts, bulk changes) are split into chunks and
+        spread over a process pool; small ones are parsed inline since pool
+        start-up would dominate.
+        """
+        if self.workers <= 1 or len(file_paths) < self.parallel_threshold:
+            return _parse_batch(self.logbook_dir, file_paths)
         
+        batches = [file_paths[i:i + self.batch_size] for i in range(0, len(file_paths), self.batch_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(batches)), mp_context=POOL_CONTEXT) as executor:
+            # map() yields batch results in submission order, keeping the output deterministic
+            for batch_results in executor.map(_parse_batch, [self.logbook_dir] * len(batches), batches):
+                results.extend(batch_results)
         return results
     
-    def _extract_observations(self, content: str) -> List[str]:
-        """Extract observations or notes from content"""
-        observations = []
-        
-        # Look for observation sections
-        obs_pattern = r'(?:## |### )?(?:observations?|notes?|remarks?)(?:\s+\d+)?:?\s*(.+?)(?=\n##|\n#|$)'
-        matches = re.findall(obs_pattern, content, re.IGNORECASE | re.DOTALL)
+    def parse_all_logbooks(self) -> List[Dict[str, Any]]:
+        """Parse all markdown files in the logbook directory
         
-        for match in matches:
-            observations.append(match.strip())
+        Files whose mtime and size match the parse cache are not re-read; only
+        new or modified files are parsed and deleted files are evicted. When
+        nothing changed since the last call the cached list is returned as is.
+        """
+        with self._lock:
+            if not os.path.exists(self.logbook_dir):
+                os.makedirs(self.logbook_dir)
+            
+            # Find all markdown files
+            pattern = os.path.join(self.logbook_dir, '**', '*.md')
+            markdown_files = glob.glob(pattern, recursive=True)
+            
+            seen = set()
+            to_parse = []
+            for file_path in markdown_files:
+                try:
+                    mtime_ns, size = self._file_signature(file_path)
+                except OSError:
+                    # Deleted between glob and stat
+                    continue
+                seen.add(file_path)
+                cached = self._cache.get(file_path)
+                if cached and cached['mtime_ns'] == mtime_ns and cached['size'] == size:
+                    continue
+                to_parse.append(file_path)
+            
+            # Files that disappeared from the tree
+            removed = [file_path for file_path in self._cache if file_path not in seen]
+            
+            self._update(to_parse, removed)
+            # Hand out a copy so callers can filter/sort without touching the cache
+            return list(self._entries)
+    
+    def refresh_files(self, file_paths: List[str]) -> bool:
+        """Re-check specific files (created, modified or deleted) without scanning the tree
         
-        return observations
+        Returns True if the corpus changed.
+        """
+        with self._lock:
+            to_parse = []
+            removed = []
+            for file_path in file_paths:
+                if not file_path.endswith('.md'):
+                    continue
+                try:
+                    mtime_ns, size = self._file_signature(file_path)
+                except OSError:
+                    if file_path in self._cache:
+                        removed.append(file_path)
+                    continue
+                cached = self._cache.get(file_path)
+                if cached and cached['mtime_ns'] == mtime_ns and cached['size'] == size:
+                    continue
+                to_parse.append(file_path)
+            return self._update(to_parse, removed)
     
-    def parse_all_logbooks(self) -> List[Dict[str, Any]]:
-        """Parse all markdown files in the logbook directory"""
-        entries = []
+    def _update(self, to_parse: List[str], removed: List[str]) -> bool:
+        """Parse changed files, evict removed ones, and publish a new sorted entry list"""
+        changed = False
+        for file_path, entry, error in self._parse_files(to_parse):
+            if error is not None:
+                print(f"Error parsing {file_path}: {error}")
+                if self._cache.pop(file_path, None) is not None:
+                    self.index.remove(file_path)
+                    self.stats.remove(file_path)
+                    changed = True
+                continue
+            # Record the signature the entry was read at, which its offsets refer to
+            self._cache[file_path] = {"mtime_ns": entry.mtime_ns, "size": entry.size, "entry": entry}
+            self.index.add(entry)
+            self.stats.add(entry)
+            changed = True
         
-        if not os.path.exists(self.logbook_dir):
-            os.makedirs(self.logbook_dir)
-            return entries
+        for file_path in removed:
+            if self._cache.pop(file_path, None) is not None:
+                self.index.remove(file_path)
+                self.stats.remove(file_path)
+                changed = True
         
-        # Find all markdown files
-        pattern = os.path.join(self.logbook_dir, '**', '*.md')
-        markdown_files = glob.glob(pattern, recursive=True)
+        if changed or self._entries is None:
+            entries = [cached['entry'] for cached in self._cache.values()]
+            # Sort by date (newest first), ties by path so the order never depends on scan order
+            entries.sort(key=lambda x: x['file_path'])
+            entries.sort(key=lambda x: x['date'], reverse=True)
+            # Swap in a new list rather than mutating, so concurrent readers see a consistent snapshot
+            self._entries = entries
+            self._version = self._signature_hash()
+            self._schedule_snapshot()
         
-        for file_path in markdown_files:
+        if changed:
+            for listener in list(self._listeners):
+                try:
+                    listener(entries)
+                except Exception as e:
+                    print(f"Error in corpus listener {listener}: {e}")
+        return changed
+    
+    def _schedule_snapshot(self):
+        """Write the snapshot now if there is none yet, else at most once per snapshot_delay"""
+        if self.snapshot_file is None or self.snapshot_file.signature == self._version:
+            return
+        if self.snapshot_file.signature is None or self.snapshot_delay <= 0:
+            self.flush_snapshot()
+        elif self._snapshot_timer is None:
+            self._snapshot_timer = threading.Timer(self.snapshot_delay, self.flush_snapshot)
+            self._snapshot_timer.daemon = True
+            self._snapshot_timer.start()
+    
+    def flush_snapshot(self):
+        """Write any pending snapshot of the cache to disk (call on shutdown)"""
+        with self._lock:
+            if self._snapshot_timer is not None:
+                self._snapshot_timer.cancel()
+                self._snapshot_timer = None
+            # The published list is never mutated, so it can be written without holding up scans
+            entries, version = self._entries, self._version
+        if self.snapshot_file is None or entries is None:
+            return
+        with self._snapshot_lock:
+            if self.snapshot_file.signature == version:
+                return
             try:
-                entry = self.parse_markdown_entry(file_path)
-                entries.append(entry)
-            except Exception as e:
-                print(f"Error parsing {file_path}: {e}")
-                continue
+                self.snapshot_file.write(entries, self.logbook_dir, version)
+            except OSError as e:
+                print(f"Error writing entry snapshot {self.snapshot_file.path}: {e}")
+    
+    def _signature_hash(self) -> str:
+        digest = hashlib.sha1()
+        for file_path in sorted(self._cache):
+            cached = self._cache[file_path]
+            digest.update(f"{file_path}\0{cached['mtime_ns']}\0{cached['size']}\n".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def corpus_version(self) -> str:
+        """Opaque version string that changes whenever any logbook file changes
         
-        # Sort by date (newest first)
-        entries.sort(key=lambda x: x['date'], reverse=True)
-        return entries
+        Derived from file signatures rather than a counter, so every worker
+        process serving the same tree reports the same version (usable as an ETag).
+        """
+        self._refresh()
+        return self._version
     
-    def save_entry(self, author: str, title: str, content: str, tags: List[str]) -> str:
-        """Save a new logbook entry to a markdown file"""
-        from datetime import datetime
-        import re
+    def _refresh(self):
+        """Rescan the tree unless the watcher already keeps the cache current"""
+        if not (self.watched and self._entries is not None):
+            self.parse_all_logbooks()
+    
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        """Register a callback invoked with the new entry list whenever the corpus changes"""
+        self._listeners.append(listener)
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current entry list, newest first
         
-        # Create author directory if it doesn't exist
-        author_dir = os.path.join(self.logbook_dir, author.lower().replace(' ', '_'))
-        os.makedirs(author_dir, exist_ok=True)
+        While a LogbookWatcher keeps the cache up to date this does no
+        filesystem I/O at all; otherwise it falls back to a cached rescan.
+        """
+        entries = self._entries
+        if self.watched and entries is not None:
+            return list(entries)
+        return self.parse_all_logbooks()
+    
+    def versioned_snapshot(self) -> Tuple[List[Dict[str, Any]], str]:
+        """snapshot() together with the corpus version it corresponds to"""
+        with self._lock:
+            return self.snapshot(), self._version
+    
+    @property
+    def version(self) -> Optional[str]:
+        """Corpus version of the published entry list, without rescanning (None before the first scan)"""
+        return self._version
+    
+    def query_entries(
+        self,
+        author: Optional[str] = None,
+        tag: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Return entries matching the filters, newest first
         
-        # Generate filename with current date and sanitized title
-        current_date = datetime.now().strftime('%Y-%m-%d')
+        Brings the cache up to date with the tree, then answers from the
+        in-memory author/date/tag indexes in O(log n + k) instead of scanning
+        the whole entry list. ``after`` is a (date, file_path) keyset cursor:
+        only entries ordered after that position are returned.
+        """
+        self._refresh()
+        return self.index.query(author=author, tag=tag, date_from=date_from, date_to=date_to, limit=limit, after=after)
+    
+    def entry_path(self, author: str, title: str, date: str) -> str:
+        """Path an entry is saved to: <logbook_dir>/<author>/<date>-<title>.md"""
         sanitized_title = re.sub(r'[^\w\s-]', '', title).strip()
         sanitized_title = re.sub(r'[-\s]+', '-', sanitized_title).lower()
-        filename = f"{current_date}-{sanitized_title}.md"
-        file_path = os.path.join(author_dir, filename)
-        
-        # Create YAML frontmatter
+        return os.path.join(self.logbook_dir, author_dir_name(author), f"{date}-{sanitized_title}.md")
+    
+    @staticmethod
+    def render_entry(author: str, date: str, title: str, content: str, tags: List[str]) -> str:
+        """Markdown file text for an entry: YAML frontmatter followed by the content"""
         frontmatter = f"""---
 author: {author}
-date: {current_date}
+date: {date}
 title: {title}
 tags: {tags}
 ---
 
 """
-        
-        # Combine frontmatter and content
-        full_content = frontmatter + content
+        return frontmatter + content
+    
+    def save_entry(self, author: str, title: str, content: str, tags: List[str]) -> str:
+        """Save a new logbook entry to a markdown file"""
+        current_date = datetime.now().strftime('%Y-%m-%d')
+        file_path = self.entry_path(author, title, current_date)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
         # Write to file
         with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(full_content)
+            f.write(self.render_entry(author, current_date, title, content, tags))
+        
+        # Make the entry visible right away instead of waiting for the next scan or watcher event
+        self.refresh_files([file_path])
+        return file_path
+    
+    @staticmethod
+    def unique_path(file_path: str, taken: Container[str]) -> str:
+        """file_path, or the first of file_path-2.md, -3.md, ... that is neither on disk nor in taken"""
+        root, ext = os.path.splitext(file_path)
+        candidate = file_path
+        n = 1
+        while candidate in taken or os.path.exists(candidate):
+            n += 1
+            candidate = f"{root}-{n}{ext}"
+        return candidate
+    
+    def write_entries(
+        self,
+        files: Iterable[Tuple[str, str]],
+        batch_size: int = 256,
+        on_error: Optional[Callable[[str, str], None]] = None
+    ) -> List[str]:
+        """Durably write many (file_path, text) entry files, then refresh the corpus once
         
-        return file_path
\ No newline at end of file
+        Each batch is written to temporary files, fsynced in one pass and
+        linked into place, so readers never see a partial entry; each
+        touched directory is fsynced once per batch. Existing files are
+        never replaced: a path that already exists (see unique_path) is
+        skipped and reported to ``on_error(file_path, error)``. Listeners see
+        one update for the whole import instead of one per file. Returns the
+        written paths.
+        """
+        if on_error is None:
+            on_error = lambda file_path, error: print(f"Error writing {file_path}: {error}")
+        written: List[str] = []
+        batch: List[Tuple[str, str]] = []
+        try:
+            for item in files:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    written.extend(self._write_batch(batch, on_error))
+                    batch = []
+            if batch:
+                written.extend(self._write_batch(batch, on_error))
+        finally:
+            # Publish whatever made it to disk, even if a later batch failed
+            if written:
+                self.refresh_files(written)
+        return written
+    
+    @staticmethod
+    def _write_batch(batch: List[Tuple[str, str]], on_error: Callable[[str, str], None]) -> List[str]:
+        pending = []
+        written = []
+        try:
+            for file_path, text in batch:
+                directory = os.path.dirname(file_path) or '.'
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+                f = os.fdopen(fd, 'w', encoding='utf-8')
+                pending.append((tmp_path, file_path, f))
+                f.write(text)
+            for _, _, f in pending:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+            directories = set()
+            for tmp_path, file_path, _ in pending:
+                # A hard link never replaces an existing file, unlike rename
+                try:
+                    os.link(tmp_path, file_path)
+                except FileExistsError:
+                    on_error(file_path, "An entry already exists at this path")
+                    continue
+                finally:
+                    os.remove(tmp_path)
+                written.append(file_path)
+                directories.add(os.path.dirname(file_path) or '.')
+            # Make the new links themselves durable
+            for directory in directories:
+                fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        except BaseException:
+            for tmp_path, _, f in pending:
+                f.close()
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+        return written
\ No newline at end of file
@@ -0,0 +1,180 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from logbook_parser import LogbookParser
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify, watching a directory tree"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> directory path
+        self.watches: Dict[int, str] = {}
+
+    def watch_tree(self, root: str):
+        """Watch root and every directory below it"""
+        for dir_path, _, _ in os.walk(root):
+            wd = self._add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dir_path}")
+            self.watches[wd] = dir_path
+
+    def read_events(self, timeout: float):
+        """Yield (directory, name, mask) for pending events, waiting up to timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            yield self.watches.get(wd), name, mask
+
+    def close(self):
+        os.close(self.fd)
+
+class LogbookWatcher:
+    """Background thread that keeps a LogbookParser's corpus current
+
+    Uses inotify on Linux and falls back to periodic rescans elsewhere (or if
+    inotify is unavailable). Changed markdown files are batched over a short
+    debounce window and applied through ``parser.refresh_files``, which in turn
+    notifies the parser's listeners so derived indexes stay in sync. While the
+    watcher runs, ``parser.snapshot()`` serves requests without touching disk.
+    """
+
+    def __init__(
+        self,
+        parser: LogbookParser,
+        poll_interval: float = 2.0,
+        debounce: float = 0.2,
+        use_inotify: bool = True
+    ):
+        self.parser = parser
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify and sys.platform.startswith('linux')
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.mode = "stopped"
+
+    def start(self):
+        """Load the corpus, then start watching in a daemon thread"""
+        if self._thread is not None:
+            return
+        self.parser.parse_all_logbooks()
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify()
+                inotify.watch_tree(self.parser.logbook_dir)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}), falling back to polling every {self.poll_interval}s")
+                if inotify is not None:
+                    inotify.close()
+                inotify = None
+        self.mode = "inotify" if inotify is not None else "polling"
+        self._stop.clear()
+        target = self._run_inotify if inotify is not None else self._run_polling
+        self._thread = threading.Thread(target=target, args=(inotify,) if inotify else (), name="logbook-watcher", daemon=True)
+        self._thread.start()
+        self.parser.watched = True
+
+    def stop(self):
+        self.parser.watched = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.mode = "stopped"
+
+    def _run_polling(self):
+        # parse_all_logbooks only stats unchanged files, so a poll is a glob plus one stat per file
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.parser.parse_all_logbooks()
+            except Exception as e:
+                print(f"Error rescanning logbooks: {e}")
+
+    def _run_inotify(self, inotify: _Inotify):
+        try:
+            while not self._stop.is_set():
+                changed: Set[str] = set()
+                rescan = False
+                deadline = None
+                # Collect events until the tree has been quiet for the debounce window
+                while not self._stop.is_set():
+                    timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+                    got_event = False
+                    for directory, name, mask in inotify.read_events(timeout):
+                        got_event = True
+                        if mask & IN_Q_OVERFLOW or directory is None:
+                            rescan = True
+                        elif mask & IN_ISDIR or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                            # Directory created, moved or removed: watch new subtrees and rescan
+                            if mask & (IN_CREATE | IN_MOVED_TO):
+                                try:
+                                    inotify.watch_tree(os.path.join(directory, name))
+                                except OSError:
+                                    pass
+                            rescan = True
+                        elif name.endswith('.md'):
+                            changed.add(os.path.join(directory, name))
+                    if got_event:
+                        deadline = time.monotonic() + self.debounce
+                    elif deadline is not None and time.monotonic() >= deadline:
+                        break
+                if rescan:
+                    self.parser.parse_all_logbooks()
+                elif changed:
+                    self.parser.refresh_files(sorted(changed))
+        except Exception as e:
+            print(f"Logbook watcher stopped with error, falling back to polling: {e}")
+            self.mode = "polling"
+            self._run_polling()
+        finally:
+            inotify.close()
@@ -1,18 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Iterator, Dict, Any
 import os
+import base64
+import hashlib
+import tarfile
+import tempfile
+import threading
 from datetime import datetime
 import json
 import glob
 from pathlib import Path
 
 from logbook_parser import LogbookParser
-from langchain_agent import ScientificLogbookAgent
+from corpus_stats import INTERVALS
+from llm_scheduler import LLMScheduler, SchedulerRejected, DEFAULT_BACKEND_LIMITS
 from user_manager import UserManager
+from job_queue import RefinementJobQueue, JobQueueFull
+from bulk_import import BulkImporter, read_ndjson, read_tarball
+from logbook_watcher import LogbookWatcher
+# langchain_agent (and with it LangChain and the provider SDKs) is imported by get_agent()
 
-app = FastAPI(title="Scientific Logbook AI", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the parsed corpus and search indexes hot; set LOGBOOK_WATCH=0 to rescan per request instead
+    if os.getenv("LOGBOOK_WATCH", "1") != "0":
+        watcher.start()
+    refine_jobs.start()
+    yield
+    refine_jobs.stop()
+    watcher.stop()
+    parser.flush_snapshot()
+    if _agent is not None:
+        await _agent.aclose()
+
+app = FastAPI(title="Scientific Logbook AI", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,16 +47,95 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the pagination cursor, cache validator and job location
+    expose_headers=["ETag", "X-Next-Cursor", "Location"],
 )
 
 # Initialize components
-parser = LogbookParser()
-agent = ScientificLogbookAgent()
-user_manager = UserManager()
+# LOGBOOK_PARSE_WORKERS caps the process pool used for cold scans (default: all cores)
+parser = LogbookParser(workers=int(os.getenv("LOGBOOK_PARSE_WORKERS", "0")) or None)
+# LLM_CONCURRENCY_<BACKEND> caps concurrent calls per backend; LLM_QUEUE_SIZE bounds the wait queue
+scheduler = LLMScheduler(
+    limits={
+        backend: int(os.getenv(f"LLM_CONCURRENCY_{backend.upper()}", str(limit)))
+        for backend, limit in DEFAULT_BACKEND_LIMITS.items()
+    },
+    max_queue=int(os.getenv("LLM_QUEUE_SIZE", "32")),
+    max_wait=float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+)
+watcher = LogbookWatcher(parser)
 
 # Current model configuration
 current_model = {"type": "openai"}
 
+# The agent, measurement index and user registry are built on first use, so a
+# worker serves / and /users without loading any LLM code or pandas (see
+# benchmarks/bench_startup.py)
+_agent = None
+_measurement_index = None
+_user_manager = None
+# Separate locks: building the agent takes seconds and must not hold up the others
+_agent_lock = threading.Lock()
+_measurement_lock = threading.Lock()
+_user_manager_lock = threading.Lock()
+
+def get_agent() -> Any:
+    """The LLM agent, imported and constructed on first use; blocks, so call it off the event loop"""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                from langchain_agent import ScientificLogbookAgent
+                agent = ScientificLogbookAgent(
+                    model_type=current_model["type"],
+                    scheduler=scheduler,
+                    stats=parser.stats,
+                    measurement_index=get_measurement_index(),
+                    entry_index=parser.index
+                )
+                # Listeners run right after the parser publishes, so parser.version matches entries
+                parser.add_listener(lambda entries: agent.sync_indexes(entries, parser.version))
+                _agent = agent
+    return _agent
+
+async def aget_agent() -> Any:
+    if _agent is not None:
+        return _agent
+    return await run_in_threadpool(get_agent)
+
+def get_measurement_index() -> Any:
+    """The Results measurement table, shared by /measurements and the agent, kept current by the parser"""
+    global _measurement_index
+    if _measurement_index is None:
+        with _measurement_lock:
+            if _measurement_index is None:
+                from measurement_index import MeasurementIndex
+                index = MeasurementIndex()
+                # Listeners only hear about later changes
+                index.sync(parser.snapshot())
+                parser.add_listener(index.sync)
+                _measurement_index = index
+    return _measurement_index
+
+def get_user_manager() -> UserManager:
+    global _user_manager
+    if _user_manager is None:
+        with _user_manager_lock:
+            if _user_manager is None:
+                _user_manager = UserManager()
+    return _user_manager
+
+# Background refinement for POST /create-entry?background=true
+refine_jobs = RefinementJobQueue(
+    get_agent,
+    parser,
+    workers=int(os.getenv("REFINE_WORKERS", "2")),
+    batch_size=int(os.getenv("REFINE_BATCH_SIZE", "4"))
+)
+
+# Newest entries offered to the single-call summary; the agent keeps as many as fit its token budget
+SUMMARY_CANDIDATES = 50
+
 class QueryRequest(BaseModel):
     query: str
     user_filter: Optional[str] = None
@@ -44,6 +149,10 @@ class CreateEntryRequest(BaseModel):
 class AddUserRequest(BaseModel):
     name: str
 
+class UsersBatchRequest(BaseModel):
+    add: List[str] = []
+    remove: List[str] = []
+
 class ModelConfigRequest(BaseModel):
     model_type: str  # "openai" or "local"
 
@@ -54,6 +163,48 @@ class LogbookEntry(BaseModel):
     content: str
     tags: List[str] = []
 
+# Fields /entries returns when no projection is requested, and everything it can project
+DEFAULT_ENTRY_FIELDS = list(LogbookEntry.model_fields)
+ENTRY_FIELDS = DEFAULT_ENTRY_FIELDS + ["file_path", "experiments", "results", "observations"]
+
+def encode_cursor(entry: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just past an entry in (date desc, path) order"""
+    raw = json.dumps([entry['date'], entry['file_path']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        date, file_path = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(date), str(file_path)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def overloaded(e: SchedulerRejected) -> HTTPException:
+    """429/503 for a request the LLM scheduler turned away, with a Retry-After hint"""
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def sse_response(events: Iterator[Dict[str, Any]]) -> StreamingResponse:
+    """Wrap an iterator of {"event", "data"} dicts as a Server-Sent Events response
+    
+    The iterator is synchronous (LLM/agent calls block), so Starlette drives it
+    from its thread pool and each event is flushed to the client as it arrives.
+    """
+    def encode():
+        for event in events:
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Scientific Logbook AI API"}
@@ -62,39 +213,168 @@ async def root():
 async def query_logbook(request: QueryRequest):
     """Query the logbook data using natural language"""
     try:
-        # Parse all logbook entries
-        entries = parser.parse_all_logbooks()
+        # Current logbook entries (kept up to date by the watcher)
+        entries, version = await run_in_threadpool(parser.versioned_snapshot)
         
-        # Use the agent to answer the query
-        response = agent.query(request.query, entries, request.user_filter)
+        # Use the agent to answer the query without blocking the event loop
+        response = await (await aget_agent()).aquery(request.query, entries, request.user_filter, version)
         
         return {"response": response}
+    except SchedulerRejected as e:
+        raise overloaded(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/query/stream")
+async def query_logbook_stream(request: QueryRequest):
+    """Stream agent steps and answer tokens for a natural-language query (SSE)"""
+    entries, version = await run_in_threadpool(parser.versioned_snapshot)
+    return sse_response((await aget_agent()).stream_query(request.query, entries, request.user_filter, version))
+
+# Plain (sync) handlers below do blocking I/O and are run in FastAPI's thread pool
+
+@app.get("/entries")
+def get_all_entries(
+    author: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get logbook entries, newest first
+    
+    Without parameters this returns every entry, as before. ``limit`` pages
+    the result; when more entries follow, the ``X-Next-Cursor`` response
+    header holds the ``cursor`` for the next page. ``fields`` is a
+    comma-separated projection (e.g. ``author,date,title,tags`` to skip
+    content). Responses carry an ETag derived from the corpus version and the
+    request, and a matching If-None-Match returns 304 without touching entries.
+    """
+    selected = [name.strip() for name in fields.split(",") if name.strip()] if fields else DEFAULT_ENTRY_FIELDS
+    unknown = [name for name in selected if name not in ENTRY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    after = decode_cursor(cursor) if cursor else None
+    
+    try:
+        # Any change to the tree or to the request gives a different validator
+        request_key = json.dumps([author, tag, date_from, date_to, limit, cursor, selected])
+        etag = '"{}"'.format(hashlib.sha1(f"{parser.corpus_version()}:{request_key}".encode('utf-8')).hexdigest())
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        # Fetch one extra entry to learn whether another page follows
+        entries = parser.query_entries(
+            author=author,
+            tag=tag,
+            date_from=date_from,
+            date_to=date_to,
+            limit=limit + 1 if limit is not None else None,
+            after=after
+        )
+        if limit is not None and len(entries) > limit:
+            entries = entries[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(entries[-1])
+        
+        return JSONResponse([{name: entry.get(name) for name in selected} for entry in entries], headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/entries", response_model=List[LogbookEntry])
-async def get_all_entries():
-    """Get all logbook entries"""
+@app.get("/stats")
+def get_stats(
+    author: Optional[str] = None,
+    interval: str = "month",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    top_tags: int = Query(20, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Corpus statistics for dashboards: totals, per-author counts, tag facets and an activity histogram
+    
+    ``author`` narrows everything to one researcher; the histogram counts
+    entries per ``interval`` (day, week or month) between the optional
+    inclusive ``date_from``/``date_to`` bounds. Served from counters the
+    parser keeps current, with the same ETag handling as /entries.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Interval must be one of: {', '.join(INTERVALS)}")
     try:
-        entries = parser.parse_all_logbooks()
-        return entries
+        # The day is part of the key: "recent" counts move with it
+        request_key = json.dumps([author, interval, date_from, date_to, top_tags, datetime.now().strftime('%Y-%m-%d')])
+        etag = '"{}"'.format(hashlib.sha1(f"{parser.corpus_version()}:stats:{request_key}".encode('utf-8')).hexdigest())
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        stats = parser.stats
+        authors = stats.authors()
+        if author:
+            authors = [row for row in authors if row["author"].casefold() == author.casefold()]
+        return JSONResponse({
+            "overview": stats.overview(author=author),
+            "authors": authors,
+            "tags": stats.tag_facets(author=author, limit=top_tags),
+            "histogram": {
+                "interval": interval,
+                "buckets": stats.histogram(author=author, interval=interval, date_from=date_from, date_to=date_to)
+            }
+        }, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/measurements")
+def get_measurements(
+    label: Optional[str] = None,
+    unit: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    author: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    group_by: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """Quantitative readings from Results sections, filtered or aggregated
+
+    ``unit`` selects readings of that unit's quantity (mg/ml also matches
+    µg/ml readings) and applies ``min_value``/``max_value`` in it. With
+    ``group_by`` (e.g. author or label) the response holds count, mean, min
+    and max per group instead of the readings.
+    """
+    from measurement_index import records
+    try:
+        index = get_measurement_index()
+        # Cheap when nothing changed: only entries replaced since the last sync are re-extracted
+        index.sync(parser.snapshot())
+        filters = dict(label=label, unit=unit, min_value=min_value, max_value=max_value,
+                       author=author, date_from=date_from, date_to=date_to)
+        if group_by:
+            return {"groups": records(index.aggregate(group_by, **filters))}
+        readings = index.query(**filters)
+        return {"total": len(readings), "measurements": records(readings.head(limit))}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/users")
-async def get_users():
+def get_users():
     """Get list of all users"""
     try:
-        users = user_manager.get_users()
+        users = get_user_manager().get_users()
         return {"users": users}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/add-user")
-async def add_user(request: AddUserRequest):
+def add_user(request: AddUserRequest):
     """Add a new user to the system"""
     try:
-        success = user_manager.add_user(request.name)
+        success = get_user_manager().add_user(request.name)
         if success:
             return {"message": f"User '{request.name}' added successfully"}
         else:
@@ -102,31 +382,74 @@ async def add_user(request: AddUserRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/users/batch")
+def update_users(request: UsersBatchRequest):
+    """Add and remove several users in one write; returns the names that changed"""
+    try:
+        added, removed = get_user_manager().update(request.add, request.remove)
+        return {"added": added, "removed": removed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/summary")
-async def get_summary(user_filter: Optional[str] = None):
-    """Get a summary of recent scientific activities"""
+async def get_summary(user_filter: Optional[str] = None, mode: str = "latest"):
+    """Get a summary of recent scientific activities
+    
+    ``mode=latest`` (default) summarizes the newest entries in one call;
+    ``mode=hierarchical`` summarizes the whole corpus (or one user's entries)
+    through cached per-entry and per-author/week summaries.
+    """
+    if mode not in ["latest", "hierarchical"]:
+        raise HTTPException(status_code=400, detail="Mode must be 'latest' or 'hierarchical'")
     try:
-        entries = parser.parse_all_logbooks()
-        
-        # Filter by user if specified
-        if user_filter:
-            entries = [entry for entry in entries if entry['author'].lower() == user_filter.lower()]
+        if mode == "hierarchical":
+            entries = await run_in_threadpool(parser.query_entries, author=user_filter)
+            summary = await (await aget_agent()).asummarize_corpus(entries)
+            return {"summary": summary}
         
-        # Sort by date (newest first) and limit to latest 5 entries to save tokens
-        entries.sort(key=lambda x: x['date'], reverse=True)
-        entries = entries[:5]
+        # Latest entries (optionally for one user) via the entry indexes
+        entries = await run_in_threadpool(parser.query_entries, author=user_filter, limit=SUMMARY_CANDIDATES)
         
-        summary = agent.generate_summary(entries)
+        summary = await (await aget_agent()).agenerate_summary(entries, user_filter)
         return {"summary": summary}
+    except SchedulerRejected as e:
+        raise overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/summary/stream")
+async def get_summary_stream(user_filter: Optional[str] = None):
+    """Stream the summary of recent scientific activities token by token (SSE)"""
+    entries = await run_in_threadpool(parser.query_entries, author=user_filter, limit=SUMMARY_CANDIDATES)
+    return sse_response((await aget_agent()).stream_summary(entries, user_filter))
+
 @app.post("/create-entry")
-async def create_entry(request: CreateEntryRequest):
-    """Create a new logbook entry with LLM refinement"""
+async def create_entry(request: CreateEntryRequest, background: bool = False):
+    """Create a new logbook entry with LLM refinement
+    
+    With background=true the draft is queued for refinement and the request
+    returns 202 at once; poll the job's status_url for the saved entry.
+    """
+    if background:
+        try:
+            job = await run_in_threadpool(
+                refine_jobs.submit,
+                author=request.author,
+                title=request.title,
+                rough_description=request.rough_description,
+                tags=request.tags or []
+            )
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+        status_url = f"/jobs/{job['id']}"
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job['id'], "status": job['status'], "status_url": status_url},
+            headers={"Location": status_url}
+        )
     try:
         # Use the agent to refine the rough description into proper markdown
-        refined_content = agent.refine_entry(
+        refined_content = await (await aget_agent()).arefine_entry(
             author=request.author,
             title=request.title,
             rough_description=request.rough_description,
@@ -134,7 +457,8 @@ async def create_entry(request: CreateEntryRequest):
         )
         
         # Save the refined entry to a markdown file
-        file_path = parser.save_entry(
+        file_path = await run_in_threadpool(
+            parser.save_entry,
             author=request.author,
             title=request.title,
             content=refined_content,
@@ -146,14 +470,115 @@ async def create_entry(request: CreateEntryRequest):
             "file_path": file_path,
             "refined_content": refined_content
         }
+    except SchedulerRejected as e:
+        raise overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/create-entry/stream")
+async def create_entry_stream(request: CreateEntryRequest):
+    """Stream the LLM refinement of a new entry (SSE), then save it
+    
+    Emits "token" events while refining, then a "saved" event with the file
+    path and refined content once the entry is written.
+    """
+    def events():
+        refined_content = None
+        for event in get_agent().stream_refine_entry(
+            author=request.author,
+            title=request.title,
+            rough_description=request.rough_description,
+            tags=request.tags or []
+        ):
+            if event["event"] == "done":
+                refined_content = event["data"]
+                continue
+            yield event
+        if refined_content is None:
+            # Refinement was rejected by the scheduler; there is nothing to save
+            yield {"event": "done", "data": ""}
+            return
+        try:
+            file_path = parser.save_entry(
+                author=request.author,
+                title=request.title,
+                content=refined_content,
+                tags=request.tags or []
+            )
+            yield {"event": "saved", "data": {"file_path": file_path, "refined_content": refined_content}}
+        except Exception as e:
+            yield {"event": "error", "data": str(e)}
+        yield {"event": "done", "data": ""}
+    
+    return sse_response(events())
+
+@app.post("/import")
+async def import_entries(request: Request, format: str = "ndjson", refine: bool = False):
+    """Bulk import historical entries from the request body
+    
+    format=ndjson takes one JSON entry per line (author, title, content,
+    optional date and tags); format=tar takes a tar archive of markdown
+    entries, written verbatim. With refine=true, NDJSON content is refined
+    by the LLM first. Returns counts, new users and per-record errors.
+    """
+    if format not in ("ndjson", "tar"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'tar'")
+    # Spool the upload (to disk past 16 MB) so parsing and writing run off the event loop
+    body = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    try:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        
+        def run() -> Dict[str, Any]:
+            items = read_ndjson(body) if format == "ndjson" else read_tarball(body)
+            importer = BulkImporter(parser, get_user_manager(), get_agent)
+            return importer.import_items(items, refine=refine)
+        
+        return await run_in_threadpool(run)
+    except tarfile.TarError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tar archive: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        body.close()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status of a background refinement job; done jobs carry file_path and refined_content"""
+    job = refine_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/metrics")
+async def get_metrics():
+    """Cache and performance counters; agent caches are reported once the agent has been built"""
+    metrics = {
+        "llm_scheduler": scheduler.stats(),
+        "refine_jobs": refine_jobs.stats()
+    }
+    if _agent is not None:
+        metrics.update({
+            "llm_cache": _agent.response_cache.stats(),
+            "summary_cache": _agent.summary_cache.stats(),
+            "single_flight": _agent.single_flight.stats()
+        })
+    return metrics
+
 @app.get("/model-config")
 async def get_model_config():
     """Get current model configuration"""
     return current_model
 
+def switch_model(model_type: str):
+    """Make model_type the backend for the agent, whether or not it has been built yet"""
+    with _agent_lock:
+        current_model["type"] = model_type
+        # Not built yet: get_agent() will start on this backend
+        if _agent is not None:
+            _agent.switch_model(model_type)
+
 @app.post("/model-config")
 async def set_model_config(request: ModelConfigRequest):
     """Switch between OpenAI and local model"""
@@ -161,8 +586,8 @@ async def set_model_config(request: ModelConfigRequest):
         if request.model_type not in ["openai", "local"]:
             raise HTTPException(status_code=400, detail="Model type must be 'openai' or 'local'")
         
-        current_model["type"] = request.model_type
-        agent.switch_model(request.model_type)
+        # The lock may be held for seconds by an agent build, so wait for it off the event loop
+        await run_in_threadpool(switch_model, request.model_type)
         
         model_name = "Gemma-3-12B (Local)" if request.model_type == "local" else "GPT-4o-mini (OpenAI)"
         return {
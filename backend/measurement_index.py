@@ -0,0 +1,324 @@
+import os
+import re
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import pandas as pd
+
+# unit as written -> (canonical unit, factor to canonical, quantity)
+UNITS: Dict[str, Tuple[str, float, str]] = {}
+
+def _units(quantity: str, canonical: str, factors: Dict[str, float]):
+    for spelling, factor in factors.items():
+        UNITS[spelling] = (canonical, factor, quantity)
+
+_units("mass concentration", "mg/mL", {
+    "mg/ml": 1.0, "mg/mL": 1.0, "g/l": 1.0, "g/L": 1.0,
+    "µg/µl": 1.0, "μg/μl": 1.0, "ug/ul": 1.0,
+    "µg/ml": 1e-3, "µg/mL": 1e-3, "μg/ml": 1e-3, "μg/mL": 1e-3, "ug/ml": 1e-3, "ug/mL": 1e-3,
+    "ng/ml": 1e-6, "ng/mL": 1e-6, "ng/µl": 1e-3, "ng/μl": 1e-3, "ng/ul": 1e-3,
+})
+_units("molar concentration", "M", {
+    "M": 1.0, "mM": 1e-3, "µM": 1e-6, "μM": 1e-6, "uM": 1e-6, "nM": 1e-9, "pM": 1e-12,
+})
+_units("mass", "g", {
+    "kg": 1e3, "g": 1.0, "mg": 1e-3, "µg": 1e-6, "μg": 1e-6, "ug": 1e-6, "ng": 1e-9,
+})
+_units("volume", "L", {
+    "L": 1.0, "l": 1.0, "mL": 1e-3, "ml": 1e-3,
+    "µL": 1e-6, "µl": 1e-6, "μL": 1e-6, "μl": 1e-6, "uL": 1e-6, "ul": 1e-6, "nL": 1e-9, "nl": 1e-9,
+})
+_units("length", "m", {
+    "m": 1.0, "cm": 1e-2, "mm": 1e-3, "µm": 1e-6, "μm": 1e-6, "um": 1e-6, "nm": 1e-9, "Å": 1e-10,
+})
+_units("time", "s", {
+    "ms": 1e-3, "s": 1.0, "sec": 1.0, "min": 60.0, "mins": 60.0,
+    "h": 3600.0, "hr": 3600.0, "hrs": 3600.0, "hour": 3600.0, "hours": 3600.0,
+    "d": 86400.0, "day": 86400.0, "days": 86400.0,
+})
+_units("temperature", "°C", {"°C": 1.0, "ºC": 1.0})
+_units("fraction", "%", {"%": 1.0})
+_units("sequence length", "bp", {"bp": 1.0, "kb": 1e3, "kbp": 1e3, "Mb": 1e6})
+_units("rotation", "rpm", {"rpm": 1.0})
+# Unitless numbers are only recorded when a comparator marks them as a reading (">1.8")
+DIMENSIONLESS = ("", 1.0, "dimensionless")
+
+COMPARATORS = {">": ">", "<": "<", ">=": ">=", "<=": "<=", "≥": ">=", "≤": "<=", "~": "~", "≈": "~"}
+APPROXIMATE = re.compile(r'\b(?:approx(?:imately|\.)?|about|around|roughly|circa|ca\.)\s*$', re.IGNORECASE)
+NUMBER = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+MEASUREMENT = re.compile(
+    # Not part of an identifier such as A280, IC50 or K-12
+    r'(?<![\w.,/-])'
+    r'(?P<cmp>(?:>=|<=|≥|≤|>|<|~|≈)\s*)?'
+    rf'(?P<sign>-)?(?P<value>{NUMBER})'
+    rf'(?:\s*(?:-|–|to)\s*(?P<upper>{NUMBER}))?'
+    r'(?:\s*(?P<unit>' + '|'.join(re.escape(unit) for unit in sorted(UNITS, key=len, reverse=True)) + r')'
+    r'(?![\w/%°]))?'
+)
+# "- Batch 1: 12.3 mg/ml" -> label "Batch 1"
+LABELLED_LINE = re.compile(r'^\s*(?:[-*+]|\d+[.)])?\s*(?P<label>[^:]{1,80}):\s*(?P<rest>.+)$')
+LIST_ITEM = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+
+COLUMNS = [
+    "file_path", "author", "date", "title", "result_id", "context", "label",
+    "comparator", "value", "upper", "unit", "canonical_unit", "quantity",
+    "normalized_value", "normalized_upper", "text", "mtime_ns", "size"
+]
+NUMERIC_COLUMNS = ["value", "upper", "normalized_value", "normalized_upper", "mtime_ns", "size"]
+GROUP_COLUMNS = ["file_path", "author", "date", "title", "context", "label", "quantity"]
+
+def normalize_unit(unit: str) -> Tuple[str, float, str]:
+    """(canonical unit, factor, quantity) for a unit spelling; raises ValueError if unknown"""
+    unit = unit.strip()
+    if unit in UNITS:
+        return UNITS[unit]
+    folded = {spelling.casefold(): spelling for spelling in UNITS}
+    if unit.casefold() in folded and unit.casefold() not in ("m", "mm"):
+        # m/M and mm/mM differ only in case and mean different things; everything else is forgiving
+        return UNITS[folded[unit.casefold()]]
+    raise ValueError(f"Unknown unit: {unit}")
+
+def _number(text: Optional[str]) -> Optional[float]:
+    return float(text.replace(',', '')) if text else None
+
+def _sentence_label(sentence: str) -> str:
+    """Words before a sentence's first reading, e.g. 'Crystal size' for 'Crystal size approximately 0.1-0.2mm'"""
+    prefix = sentence[:MEASUREMENT.search(sentence).start()]
+    return APPROXIMATE.sub('', prefix).strip(" ,;:-")[:80]
+
+def extract_measurements(text: str) -> List[Dict[str, Any]]:
+    """(context, label, comparator, value, upper, unit, ...) readings from one Results section
+
+    A "label: values" line (bullets allowed) labels its values, e.g.
+    "Batch 1: 12.3 mg/ml"; a line ending in ":" ("Lysozyme concentrations:")
+    is the context of the lines below it. Elsewhere the words before a
+    sentence's first number label its readings. Numbers count when they
+    carry a known unit or a comparator; bare counts ("wells 1, 3 and 7")
+    are skipped.
+    """
+    measurements = []
+    context = ""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.endswith(':') and not LIST_ITEM.match(stripped):
+            context = stripped[:-1].strip()
+            continue
+        labelled = LABELLED_LINE.match(stripped)
+        if labelled:
+            sentences = [(labelled.group('label').strip(), labelled.group('rest'))]
+        else:
+            if not LIST_ITEM.match(stripped):
+                # A paragraph ends the list the last context line introduced
+                context = ""
+            body = LIST_ITEM.sub('', stripped)
+            sentences = [(None, sentence) for sentence in re.split(r'(?<=[.!?])\s+(?=[A-Z])', body)]
+        for label, sentence in sentences:
+            for match in MEASUREMENT.finditer(sentence):
+                unit = match.group('unit') or ""
+                comparator = COMPARATORS.get((match.group('cmp') or "").strip(), "=")
+                if comparator == "=" and APPROXIMATE.search(sentence[:match.start()]):
+                    comparator = "~"
+                if not unit and comparator == "=":
+                    continue
+                value = _number(match.group('value'))
+                if match.group('sign'):
+                    value = -value
+                upper = _number(match.group('upper'))
+                if upper is not None and upper < value:
+                    # "2024-06" and the like are not ranges
+                    continue
+                canonical, factor, quantity = UNITS[unit] if unit else DIMENSIONLESS
+                measurements.append({
+                    "context": context,
+                    "label": label if label is not None else _sentence_label(sentence),
+                    "comparator": comparator,
+                    "value": value,
+                    "upper": upper,
+                    "unit": unit,
+                    "canonical_unit": canonical,
+                    "quantity": quantity,
+                    "normalized_value": value * factor,
+                    "normalized_upper": upper * factor if upper is not None else None,
+                    "text": sentence.strip()[:200]
+                })
+    return measurements
+
+class MeasurementIndex:
+    """Columnar table of the quantitative readings in every entry's Results sections
+
+    One row per reading with its value and unit as written plus the value in
+    the quantity's canonical unit (mg/mL, M, g, L, m, s, ...), so thresholds
+    given in any unit compare across entries. Rows are kept per entry and
+    only re-extracted when the entry changed; the table is persisted as CSV
+    at ``path`` with each file's signature, so a restart re-reads nothing
+    that did not change. Entries without readings keep one empty row to
+    record their signature.
+    """
+
+    def __init__(self, path: Optional[str] = ".cache/measurements.csv"):
+        self.path = path
+        # file_path -> rows (dicts over COLUMNS); [] for an entry without readings
+        self._rows: Dict[str, List[Dict[str, Any]]] = {}
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        # file_path -> entry object, for identity-based sync()
+        self._entries: Dict[str, Any] = {}
+        self._table: Optional[pd.DataFrame] = None
+        self._lock = threading.RLock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.table())
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            df = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable measurement index {self.path}: {e}")
+            return
+        if list(df.columns) != COLUMNS:
+            return
+        for column in NUMERIC_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        for file_path, group in df.groupby('file_path', sort=False):
+            records = group.to_dict('records')
+            self._signatures[file_path] = (int(records[0]['mtime_ns']), int(records[0]['size']))
+            self._rows[file_path] = [row for row in records if not pd.isna(row['value'])]
+
+    def _save(self):
+        if not self.path:
+            return
+        rows = []
+        for file_path, entry_rows in self._rows.items():
+            if entry_rows:
+                rows.extend(entry_rows)
+            else:
+                mtime_ns, size = self._signatures[file_path]
+                rows.append({"file_path": file_path, "mtime_ns": mtime_ns, "size": size})
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        pd.DataFrame(rows, columns=COLUMNS).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+    def _extract(self, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = []
+        for result in entry.get('results') or []:
+            for measurement in extract_measurements(result['description']):
+                rows.append({
+                    "file_path": entry['file_path'],
+                    "author": str(entry['author']),
+                    "date": str(entry['date']),
+                    "title": str(entry['title']),
+                    "result_id": result['id'],
+                    **measurement,
+                    "mtime_ns": entry.mtime_ns,
+                    "size": entry.size
+                })
+        return rows
+
+    def sync(self, entries: List[Dict[str, Any]]):
+        """Bring the table in line with an entry list, re-extracting only changed entries"""
+        with self._lock:
+            current = {entry['file_path']: entry for entry in entries}
+            changed = False
+            for file_path in [file_path for file_path in self._rows if file_path not in current]:
+                del self._rows[file_path]
+                del self._signatures[file_path]
+                self._entries.pop(file_path, None)
+                changed = True
+            for file_path, entry in current.items():
+                if self._entries.get(file_path) is entry:
+                    continue
+                self._entries[file_path] = entry
+                signature = (entry.mtime_ns, entry.size)
+                if self._signatures.get(file_path) == signature:
+                    # Loaded from disk for this very file version
+                    continue
+                self._rows[file_path] = self._extract(entry)
+                self._signatures[file_path] = signature
+                changed = True
+            if changed:
+                self._table = None
+                try:
+                    self._save()
+                except OSError as e:
+                    print(f"Error writing measurement index {self.path}: {e}")
+
+    def table(self) -> pd.DataFrame:
+        """All readings as a DataFrame over COLUMNS, rebuilt after changes only"""
+        with self._lock:
+            if self._table is None:
+                rows = [row for entry_rows in self._rows.values() for row in entry_rows]
+                table = pd.DataFrame(rows, columns=COLUMNS)
+                for column in NUMERIC_COLUMNS:
+                    table[column] = pd.to_numeric(table[column])
+                self._table = table
+            return self._table
+
+    def query(
+        self,
+        label: Optional[str] = None,
+        unit: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        author: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Readings matching all filters, newest entry first
+
+        ``label`` matches the label or context as a case-insensitive
+        substring. ``unit`` restricts readings to that unit's quantity,
+        expresses the inclusive ``min_value``/``max_value`` bounds in it and
+        adds a ``value_in_unit`` column; without a unit the bounds apply to
+        values as written.
+        """
+        df = self.table()
+        mask = pd.Series(True, index=df.index)
+        column, factor = "value", 1.0
+        if unit:
+            _, factor, quantity = normalize_unit(unit)
+            mask &= df["quantity"] == quantity
+            column = "normalized_value"
+        if label:
+            mask &= (
+                df["label"].str.contains(label, case=False, regex=False)
+                | df["context"].str.contains(label, case=False, regex=False)
+            )
+        if author:
+            mask &= df["author"].str.casefold() == author.casefold()
+        if date_from:
+            mask &= df["date"] >= date_from
+        if date_to:
+            mask &= df["date"] <= date_to
+        if min_value is not None:
+            mask &= df[column] >= min_value * factor
+        if max_value is not None:
+            mask &= df[column] <= max_value * factor
+        result = df[mask]
+        if unit:
+            result = result.assign(value_in_unit=result["normalized_value"] / factor)
+        return result.sort_values(["date", "file_path"], ascending=[False, True], kind="stable")
+
+    def aggregate(self, by: str, unit: Optional[str] = None, **filters: Any) -> pd.DataFrame:
+        """count/mean/min/max of matching readings per ``by`` column and quantity
+
+        Statistics are in ``unit`` when given, else in each quantity's
+        canonical unit.
+        """
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Cannot group by {by}; use one of: {', '.join(GROUP_COLUMNS)}")
+        df = self.query(unit=unit, **filters)
+        column = "value_in_unit" if unit else "normalized_value"
+        keys = [by] if by == "quantity" else [by, "quantity"]
+        grouped = df.groupby(keys + ["canonical_unit"], sort=True)[column].agg(["count", "mean", "min", "max"]).reset_index()
+        if unit:
+            grouped["canonical_unit"] = unit
+        return grouped.rename(columns={"canonical_unit": "unit"})
+
+def records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON-ready rows, with NaN as None"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
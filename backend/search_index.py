@@ -0,0 +1,142 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Very common English words that carry no retrieval signal
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or
+that the their then there these this to was were which while with
+""".split())
+
+# Term-frequency multipliers per field (a simple BM25F-style weighting)
+FIELD_WEIGHTS = {
+    "title": 3,
+    "tags": 2,
+    "content": 1,
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into alphanumeric tokens, dropping stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """Incremental inverted index with BM25 ranking over logbook entries
+
+    Documents are keyed by file path. Each entry's title, tags and content
+    (which includes the Experiment/Results/Observations sections) are tokenized
+    once when the entry is added; queries only touch the postings of their own
+    terms, so lookups do not scale with total corpus size.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_key: weighted term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # doc_key -> weighted term frequencies, kept so a document can be removed
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+        # doc_key -> entry dict the document was built from
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Readers (tool calls) and writers (watcher updates) run on different threads
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry_terms(self, entry: Dict[str, Any]) -> Dict[str, int]:
+        """Weighted term frequencies for an entry"""
+        counts: Counter = Counter()
+        fields = {
+            "title": str(entry.get('title', '')),
+            "tags": " ".join(str(tag) for tag in entry.get('tags', []) or []),
+            "content": entry.get('content', ''),
+        }
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                counts[token] += weight
+        return dict(counts)
+
+    def add(self, entry: Dict[str, Any]):
+        """Index an entry, replacing any previous version with the same file path"""
+        key = entry['file_path']
+        if key in self._entries:
+            self.remove(key)
+        terms = self._entry_terms(entry)
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[key] = tf
+        length = sum(terms.values())
+        self._doc_terms[key] = terms
+        self._doc_len[key] = length
+        self._total_len += length
+        self._entries[key] = entry
+
+    def remove(self, key: str):
+        """Drop a document from the index"""
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(key)
+        del self._entries[key]
+
+    def sync(self, entries: List[Dict[str, Any]]):
+        """Bring the index in line with an entry list
+
+        The parser hands out the same dict object for an unchanged file, so only
+        entries whose object identity changed are re-tokenized.
+        """
+        with self._lock:
+            current = {}
+            for entry in entries:
+                current[entry['file_path']] = entry
+            for key in [key for key in self._entries if key not in current]:
+                self.remove(key)
+            for key, entry in current.items():
+                if self._entries.get(key) is not entry:
+                    self.add(entry)
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Tuple[int, List[Tuple[float, Dict[str, Any]]]]:
+        """Rank documents for a query
+
+        Returns the total number of matching documents and the top ``k``
+        (score, entry) pairs, best first. ``predicate`` restricts matches, e.g.
+        to a single author.
+        """
+        with self._lock:
+            query_terms = set(tokenize(query))
+            n_docs = len(self._entries)
+            if not query_terms or n_docs == 0:
+                return 0, []
+            avg_len = self._total_len / n_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for key, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[key] / avg_len)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if predicate is not None:
+                scores = {key: score for key, score in scores.items() if predicate(self._entries[key])}
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return len(scores), [(score, self._entries[key]) for key, score in top]
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class _LeaderAbandoned(Exception):
+    """The leader was cancelled or interrupted; its followers run the call themselves"""
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight wait for and receive the same result or exception.
+    Sync (thread) and async callers share one registry, so a request served
+    from the thread pool can piggyback on one awaited on the event loop and
+    vice versa.
+
+    Only the leader's result or ``Exception`` is shared. If the leader is
+    cancelled (its client went away) or interrupted, the key is cleared and
+    a waiting follower becomes the new leader; cancelling a follower never
+    affects the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._counters = {"executed": 0, "deduplicated": 0}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether the caller is its leader"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counters["deduplicated"] += 1
+                return future, False
+            future = Future()
+            # A running future cannot be cancelled through a follower's wrap_future()
+            future.set_running_or_notify_cancel()
+            self._inflight[key] = future
+            self._counters["executed"] += 1
+            return future, True
+
+    def _finish(self, key: str):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() once for all concurrent callers with the same key"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _LeaderAbandoned:
+                continue
+        try:
+            result = fn()
+        except Exception as e:
+            future.set_exception(e)
+            self._finish(key)
+            raise
+        except BaseException:
+            self._abandon(key, future)
+            raise
+        # Publish before deregistering so late joiners still get this result
+        future.set_result(result)
+        self._finish(key)
+        return result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of do(); fn is a coroutine function"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return await asyncio.wrap_future(future)
+            except _LeaderAbandoned:
+                continue
+        try:
+            result = await fn()
+        except Exception as e:
+            future.set_exception(e)
+            self._finish(key)
+            raise
+        except BaseException:
+            self._abandon(key, future)
+            raise
+        # Publish before deregistering so late joiners still get this result
+        future.set_result(result)
+        self._finish(key)
+        return result
+
+    def _abandon(self, key: str, future: Future):
+        """Deregister a cancelled leader, then wake its followers to retry"""
+        self._finish(key)
+        future.set_exception(_LeaderAbandoned())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._inflight)}
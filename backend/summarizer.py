@@ -0,0 +1,212 @@
+import asyncio
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Awaitable, Tuple, Iterator
+
+from langchain_core.prompts import PromptTemplate
+
+ENTRY_PROMPT = PromptTemplate(
+    input_variables=["author", "date", "title", "tags", "content"],
+    template="""
+    Summarize this scientific logbook entry in at most 80 words. Keep the aim, the key methods,
+    concrete results (numbers, units, outcomes) and any open issues. Return only the summary.
+
+    Author: {author}
+    Date: {date}
+    Title: {title}
+    Tags: {tags}
+
+    {content}
+    """
+)
+
+GROUP_PROMPT = PromptTemplate(
+    input_variables=["author", "week", "summaries"],
+    template="""
+    Below are summaries of the logbook entries {author} wrote in week {week}.
+    Combine them into one summary of at most 120 words covering what was attempted, what was
+    found and what is still open. Return only the summary.
+
+    {summaries}
+    """
+)
+
+PERIOD_PROMPT = PromptTemplate(
+    input_variables=["period", "summaries"],
+    template="""
+    Below are summaries of a research team's logbook activity in {period}, oldest first, each
+    labelled with the researcher and week or the period it covers. Combine them into one
+    summary of at most 200 words that keeps who did what, the main findings and open
+    questions. Return only the summary.
+
+    {summaries}
+    """
+)
+
+ROLLUP_PROMPT = PromptTemplate(
+    input_variables=["summaries"],
+    template="""
+    Below are summaries of a research team's logbook activity, oldest first, each labelled with
+    the researcher and week or the period it covers. Write a well-structured summary that includes:
+    1. Overview of research activity and how it developed over time
+    2. Key research areas and trends
+    3. Individual researcher contributions
+    4. Notable experiments and findings
+    5. Recommendations for future work
+
+    {summaries}
+    """
+)
+
+def week_key(date_str: str) -> str:
+    """ISO week (e.g. 2024-W25) for a YYYY-MM-DD date, or "undated" """
+    try:
+        year, week, _ = datetime.strptime(date_str, '%Y-%m-%d').isocalendar()
+    except (TypeError, ValueError):
+        return "undated"
+    return f"{year}-W{week:02d}"
+
+def week_period(week: str, level: str, years: int = 1) -> str:
+    """Month (2024-06), quarter (2024-Q2) or year an ISO week belongs to, by its Thursday as ISO does
+
+    With ``years`` > 1 the "year" level is a block of that many years
+    aligned to multiples of it (2016-2023 for 8).
+    """
+    if week == "undated":
+        return week
+    thursday = datetime.strptime(f"{week}-4", '%G-W%V-%u')
+    if level == "month":
+        return f"{thursday.year}-{thursday.month:02d}"
+    if level == "quarter":
+        return f"{thursday.year}-Q{(thursday.month - 1) // 3 + 1}"
+    if years > 1:
+        start = thursday.year - thursday.year % years
+        return f"{start}-{start + years - 1}"
+    return str(thursday.year)
+
+class HierarchicalSummarizer:
+    """Map-reduce summaries of a whole corpus: entry -> author/week -> team
+
+    Every node is one completion whose prompt is rendered from its children's
+    text, and ``complete`` serves completions from a content-addressed cache.
+    A node is therefore only recomputed when one of its inputs changed: adding
+    an entry costs its own summary, its author/week group and the rollup
+    nodes above it. Above the author/week level nodes are merged by calendar
+    month, then quarter, then year, then blocks of ``fan_in``, ``fan_in``^2...
+    years, until at most ``fan_in`` remain for the final rollup. A node's
+    inputs depend only on the activity within its own period: a back-dated
+    entry or a new author only recomputes the periods they fall in. A period
+    with more than ``fan_in`` nodes is reduced in chunks within that period,
+    again at the next level if need be.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[PromptTemplate, Dict[str, Any]], Awaitable[str]],
+        max_concurrency: int = 4,
+        fan_in: int = 8,
+        entry_chars: int = 4000
+    ):
+        self.complete = complete
+        # Cold runs fan out one call per entry; keep them well within the scheduler's queue
+        self.max_concurrency = max_concurrency
+        # At least 2, or reducing a period would never shrink it
+        self.fan_in = max(fan_in, 2)
+        self.entry_chars = entry_chars
+
+    async def summarize(self, entries: List[Dict[str, Any]]) -> str:
+        """Team summary of all given entries"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(prompt: PromptTemplate, inputs: Dict[str, Any]) -> str:
+            async with semaphore:
+                return (await self.complete(prompt, inputs)).strip()
+
+        # Level 1: one summary per entry, grouped by author and week (oldest first)
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for entry in sorted(entries, key=lambda e: (e['date'], e['file_path'])):
+            groups.setdefault((week_key(entry['date']), str(entry['author'])), []).append(entry)
+        ordered = sorted(groups.items())
+        entry_summaries = await asyncio.gather(*[
+            asyncio.gather(*[run(ENTRY_PROMPT, self._entry_inputs(entry)) for entry in group])
+            for _, group in ordered
+        ])
+
+        # Level 2: one summary per author and week; a single entry is its own group summary
+        async def group_summary(week: str, author: str, summaries: List[str]) -> str:
+            if len(summaries) == 1:
+                return summaries[0]
+            return await run(GROUP_PROMPT, {
+                "author": author,
+                "week": week,
+                "summaries": "\n\n".join(f"- {summary}" for summary in summaries)
+            })
+
+        group_summaries = await asyncio.gather(*[
+            group_summary(week, author, summaries)
+            for ((week, author), _), summaries in zip(ordered, entry_summaries)
+        ])
+        # (week, label, summary) nodes, oldest first; the week places a node in its month, quarter and year
+        nodes = [
+            (week, f"{author}, {week}", summary)
+            for ((week, author), _), summary in zip(ordered, group_summaries)
+        ]
+
+        # Level 3+: merge nodes within each calendar period, coarsening until at most fan_in remain
+        for level, years in self._levels():
+            if len(nodes) <= self.fan_in:
+                break
+            periods: Dict[str, List[Tuple[str, str, str]]] = {}
+            for node in nodes:
+                periods.setdefault(week_period(node[0], level, years), []).append(node)
+            reduced = await asyncio.gather(*[
+                self._reduce_period(run, period, members) for period, members in periods.items()
+            ])
+            nodes = [node for period_nodes in reduced for node in period_nodes]
+        return await run(ROLLUP_PROMPT, {"summaries": self._render(nodes)})
+
+    def _levels(self) -> Iterator[Tuple[str, int]]:
+        """(level, years) of each reduction pass, ever coarser
+
+        Every pass shrinks any period holding more than one node, and the
+        year blocks eventually span the whole corpus, so the node count always
+        reaches fan_in.
+        """
+        yield "month", 1
+        yield "quarter", 1
+        years = 1
+        while True:
+            yield "year", years
+            years *= self.fan_in
+
+    async def _reduce_period(
+        self,
+        run: Callable[[PromptTemplate, Dict[str, Any]], Awaitable[str]],
+        period: str,
+        nodes: List[Tuple[str, str, str]]
+    ) -> List[Tuple[str, str, str]]:
+        """One node summarizing a period; a single node stands for its period as is"""
+        if len(nodes) == 1:
+            return nodes
+        chunks = [nodes[i:i + self.fan_in] for i in range(0, len(nodes), self.fan_in)]
+        summaries = await asyncio.gather(*[
+            run(PERIOD_PROMPT, {"period": period, "summaries": self._render(chunk)}) for chunk in chunks
+        ])
+        if len(chunks) == 1:
+            return [(nodes[0][0], period, summaries[0])]
+        return [
+            (chunk[0][0], f"{period}, part {i + 1}", summary)
+            for i, (chunk, summary) in enumerate(zip(chunks, summaries))
+        ]
+
+    @staticmethod
+    def _render(nodes: List[Tuple[str, str, str]]) -> str:
+        return "\n\n".join(f"[{label}] {summary}" for _, label, summary in nodes)
+
+    def _entry_inputs(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "author": entry['author'],
+            "date": entry['date'],
+            "title": entry['title'],
+            "tags": ", ".join(str(tag) for tag in entry.get('tags') or []) or "None",
+            "content": entry['content'][:self.entry_chars]
+        }
@@ -1,18 +1,46 @@
 import json
 import os
-from typing import List, Set
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: writes are then only serialized within this process
+    fcntl = None
 
 class UserManager:
-    def __init__(self, users_file: str = "users.json"):
+    """Registry of user names backed by a JSON file
+    
+    Users are held in memory as a set and served without touching the file;
+    the file's (mtime, size) is checked at most every ``check_interval``
+    seconds and the set reloaded when another process changed it. Writes
+    take an exclusive lock on ``<users_file>.lock`` (shared by all uvicorn
+    workers), re-read the file under the lock so no concurrent change is
+    lost, and replace it atomically through a fsynced temporary file.
+    """
+    
+    def __init__(self, users_file: str = "users.json", check_interval: float = 1.0):
         self.users_file = users_file
+        self.lock_file = f"{users_file}.lock"
+        self.check_interval = check_interval
+        self._users: Set[str] = set()
+        self._sorted: List[str] = []
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
         self._ensure_users_file()
     
     def _ensure_users_file(self):
         """Create users file if it doesn't exist"""
-        if not os.path.exists(self.users_file):
-            # Initialize with existing users from logbook directories if any
-            initial_users = self._get_users_from_logbooks()
-            self._save_users(initial_users)
+        if os.path.exists(self.users_file):
+            return
+        with self._write_lock():
+            # Another process may have created it while we waited for the lock
+            if not os.path.exists(self.users_file):
+                # Initialize with existing users from logbook directories if any
+                self._save_users(self._get_users_from_logbooks())
     
     def _get_users_from_logbooks(self) -> List[str]:
         """Extract existing users from logbook directory structure"""
@@ -28,42 +56,108 @@ class UserManager:
         
         return sorted(list(users))
     
-    def _load_users(self) -> List[str]:
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Serialize writers across threads and, where fcntl exists, across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, 'a') as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+    
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.users_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def _load_users(self) -> Set[str]:
         """Load users from JSON file"""
         try:
             with open(self.users_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return data.get('users', [])
+                return set(data.get('users', []))
         except (FileNotFoundError, json.JSONDecodeError):
-            return []
+            return set()
+    
+    def _remember(self, users: Set[str], signature: Optional[Tuple[int, int]]):
+        self._users = users
+        self._sorted = sorted(users)
+        self._signature = signature
+        self._checked_at = time.monotonic()
     
-    def _save_users(self, users: List[str]):
-        """Save users to JSON file"""
-        with open(self.users_file, 'w', encoding='utf-8') as f:
+    def _current(self) -> Set[str]:
+        """The cached user set, reloaded if the file changed since it was read"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._users
+        signature = self._file_signature()
+        if signature != self._signature:
+            # Stat before reading: a change racing the read shows up as a new signature next time
+            self._remember(self._load_users(), signature)
+        else:
+            self._checked_at = time.monotonic()
+        return self._users
+    
+    def _save_users(self, users: Set[str]):
+        """Atomically replace the users file and update the cache"""
+        tmp_path = f"{self.users_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump({'users': sorted(users)}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.users_file)
+        self._remember(set(users), self._file_signature())
+    
+    def update(self, add: List[str], remove: List[str]) -> Tuple[List[str], List[str]]:
+        """Apply additions and removals in one locked read-modify-write; returns what changed"""
+        with self._write_lock():
+            users = self._load_users()
+            added = []
+            for name in add:
+                name = name.strip()
+                if name and name not in users:
+                    users.add(name)
+                    added.append(name)
+            removed = []
+            for name in remove:
+                name = name.strip()
+                if name in users:
+                    users.remove(name)
+                    removed.append(name)
+            if added or removed:
+                self._save_users(users)
+            return added, removed
     
     def get_users(self) -> List[str]:
         """Get all users"""
-        return self._load_users()
+        self._current()
+        return list(self._sorted)
+    
+    def has_user(self, name: str) -> bool:
+        return name in self._current()
     
     def add_user(self, name: str) -> bool:
         """Add a new user if they don't exist"""
-        name = name.strip()
-        if not name:
-            return False
-        
-        users = self._load_users()
-        if name not in users:
-            users.append(name)
-            self._save_users(users)
-            return True
-        return False
+        added, _ = self.update([name], [])
+        return bool(added)
+    
+    def add_users(self, names: List[str]) -> List[str]:
+        """Add several users with a single write; returns the names that were new"""
+        added, _ = self.update(names, [])
+        return added
     
     def remove_user(self, name: str) -> bool:
         """Remove a user"""
-        users = self._load_users()
-        if name in users:
-            users.remove(name)
-            self._save_users(users)
-            return True
-        return False
\ No newline at end of file
+        _, removed = self.update([], [name])
+        return bool(removed)
+    
+    def remove_users(self, names: List[str]) -> List[str]:
+        """Remove several users with a single write; returns the names that were present"""
+        _, removed = self.update([], names)
+        return removed
@@ -0,0 +1,342 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from typing import List, Dict, Any, Optional, Callable, Tuple, Protocol
+
+import numpy as np
+
+from search_index import tokenize
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: each process then uses a store named after its pid
+    fcntl = None
+
+class Embedder(Protocol):
+    """Anything that turns texts into fixed-size float32 vectors"""
+
+    name: str
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+class HashingEmbedder:
+    """Offline embedder using the hashing trick over unigrams and bigrams
+
+    Needs no model download or network access. Each token is hashed to a
+    signed bucket with sublinear (1 + log tf) weighting and the vector is
+    L2-normalized, so a dot product is a cosine similarity.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-v1-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            counts: Dict[int, float] = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode('utf-8'))
+                bucket = h % self.dim
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+            for bucket, value in counts.items():
+                vectors[i, bucket] = np.sign(value) * (1.0 + np.log(abs(value))) if value else 0.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+def chunk_entry(entry: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Split an entry into (section, text) chunks along its Experiment/Results/Observations sections
+
+    Entries without recognised sections become a single content chunk. The
+    title is prefixed to every chunk so short sections keep their context.
+    """
+    title = str(entry.get('title', ''))
+    chunks = []
+    for experiment in entry.get('experiments', []) or []:
+        chunks.append(("Experiment", experiment['description']))
+    for result in entry.get('results', []) or []:
+        chunks.append(("Results", result['description']))
+    for observation in entry.get('observations', []) or []:
+        chunks.append(("Observations", observation))
+    if not chunks:
+        chunks.append(("Content", entry.get('content', '')))
+    return [(section, f"{title}\n{section}: {text}") for section, text in chunks]
+
+def _chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class VectorIndex:
+    """Semantic chunk index backed by a memory-mapped float32 matrix
+
+    Each distinct chunk text owns one row of ``vectors-<slot>.f32`` in
+    ``store_dir``; ``vectors-<slot>.json`` records which chunk hash lives in
+    which row. Rows are looked up by hash, so only chunks whose text changed
+    are ever re-embedded, and rows of deleted chunks are recycled.
+
+    Row assignment is private to one index, so each index owns a store slot
+    of its own: the lowest-numbered slot whose ``slot-<n>.lock`` it can lock.
+    Concurrent uvicorn workers therefore never write each other's rows, and a
+    restarted worker takes over a released slot and its vectors.
+    """
+
+    def __init__(self, store_dir: Optional[str] = ".cache/vectors", embedder: Optional[Embedder] = None):
+        self.store_dir = store_dir
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        # row -> chunk hash (None for a free row)
+        self._row_hash: List[Optional[str]] = []
+        self._hash_row: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._matrix: np.ndarray = np.zeros((0, self.dim), dtype=np.float32)
+        # entry key -> entry dict and its (section, chunk hash) list
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._entry_chunks: Dict[str, List[Tuple[str, str]]] = {}
+        # chunk hash -> set of entry keys that contain the chunk
+        self._hash_entries: Dict[str, set] = {}
+        # Readers (tool calls) and writers (watcher updates) run on different threads
+        self._lock = threading.RLock()
+        self._slot: Optional[str] = None
+        self._slot_lock = None
+        if self.store_dir:
+            self._claim_slot()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def _matrix_path(self) -> Optional[str]:
+        return os.path.join(self.store_dir, f"vectors-{self._slot}.f32") if self.store_dir else None
+
+    @property
+    def _meta_path(self) -> Optional[str]:
+        return os.path.join(self.store_dir, f"vectors-{self._slot}.json") if self.store_dir else None
+
+    def _claim_slot(self):
+        """Lock the first free store slot for this index's lifetime; the OS drops it if the process dies"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        if fcntl is None:
+            self._slot = f"p{os.getpid()}"
+            return
+        n = 0
+        while True:
+            lock = open(os.path.join(self.store_dir, f"slot-{n}.lock"), 'a')
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                n += 1
+                continue
+            self._slot, self._slot_lock = str(n), lock
+            return
+
+    def close(self):
+        """Flush the store and release its slot for another index"""
+        with self._lock:
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self._row_hash, self._hash_row, self._free_rows = [], {}, []
+            self._entries, self._entry_chunks, self._hash_entries = {}, {}, {}
+            if self._slot_lock is not None:
+                self._slot_lock.close()
+                self._slot_lock = None
+
+    def _load(self):
+        """Reopen the persisted matrix if it was built by the same embedder"""
+        if not self.store_dir or not os.path.exists(self._meta_path) or not os.path.exists(self._matrix_path):
+            return
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable vector index {self._meta_path}: {e}")
+            return
+        if meta.get('embedder') != self.embedder.name or meta.get('dim') != self.dim:
+            return
+        row_hash = meta.get('rows', [])
+        capacity = os.path.getsize(self._matrix_path) // (4 * self.dim)
+        if capacity < len(row_hash):
+            return
+        if capacity:
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._row_hash = row_hash
+        for row, chunk_hash in enumerate(row_hash):
+            if chunk_hash is None:
+                self._free_rows.append(row)
+            else:
+                self._hash_row[chunk_hash] = row
+
+    def _save(self):
+        if not self.store_dir:
+            return
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'embedder': self.embedder.name, 'dim': self.dim, 'rows': self._row_hash}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _ensure_capacity(self, n_rows: int):
+        """Grow the matrix (and its backing file) to hold at least n_rows rows"""
+        capacity = self._matrix.shape[0]
+        if n_rows <= capacity:
+            return
+        new_capacity = max(n_rows, capacity * 2, 1024)
+        if not self.store_dir:
+            grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+            grown[:capacity] = self._matrix
+            self._matrix = grown
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        with open(self._matrix_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(new_capacity, self.dim))
+
+    def _assign_rows(self, texts_by_hash: Dict[str, str]):
+        """Embed chunks that have no row yet, in one batch"""
+        missing = [chunk_hash for chunk_hash in texts_by_hash if chunk_hash not in self._hash_row]
+        if not missing:
+            return
+        vectors = self.embedder.embed([texts_by_hash[chunk_hash] for chunk_hash in missing])
+        new_rows = len(missing) - len(self._free_rows)
+        self._ensure_capacity(len(self._row_hash) + max(new_rows, 0))
+        for chunk_hash, vector in zip(missing, vectors):
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._row_hash[row] = chunk_hash
+            else:
+                row = len(self._row_hash)
+                self._row_hash.append(chunk_hash)
+            self._matrix[row] = vector
+            self._hash_row[chunk_hash] = row
+
+    def _release_unused_rows(self):
+        """Free rows whose chunk no longer belongs to any entry"""
+        for chunk_hash in [h for h in self._hash_row if not self._hash_entries.get(h)]:
+            row = self._hash_row.pop(chunk_hash)
+            self._row_hash[row] = None
+            self._matrix[row] = 0.0
+            self._free_rows.append(row)
+            self._hash_entries.pop(chunk_hash, None)
+
+    def sync(self, entries: List[Dict[str, Any]]):
+        """Bring the index in line with an entry list, re-chunking only changed entries"""
+        with self._lock:
+            current = {entry['file_path']: entry for entry in entries}
+            changed = False
+            for key in [key for key in self._entries if key not in current]:
+                self._drop_entry(key)
+                changed = True
+            texts_by_hash: Dict[str, str] = {}
+            for key, entry in current.items():
+                if self._entries.get(key) is entry:
+                    continue
+                self._drop_entry(key)
+                chunks = []
+                for section, text in chunk_entry(entry):
+                    chunk_hash = _chunk_hash(text)
+                    texts_by_hash[chunk_hash] = text
+                    chunks.append((section, chunk_hash))
+                    self._hash_entries.setdefault(chunk_hash, set()).add(key)
+                self._entries[key] = entry
+                self._entry_chunks[key] = chunks
+                changed = True
+            if not changed:
+                return
+            self._assign_rows(texts_by_hash)
+            self._release_unused_rows()
+            self._save()
+
+    def _drop_entry(self, key: str):
+        self._entries.pop(key, None)
+        for _, chunk_hash in self._entry_chunks.pop(key, []):
+            keys = self._hash_entries.get(chunk_hash)
+            if keys is not None:
+                keys.discard(key)
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        block_rows: int = 65536
+    ) -> List[List[Tuple[float, Dict[str, Any], str]]]:
+        """Top-k (score, entry, section) per query, one hit per entry, best first
+
+        Scores for all queries are computed together as a matrix product over
+        the memory-mapped vectors, block by block.
+        """
+        with self._lock:
+            n_rows = len(self._row_hash)
+            if not queries or n_rows == 0:
+                return [[] for _ in queries]
+            query_vectors = self.embedder.embed(queries)
+            scores = np.empty((len(queries), n_rows), dtype=np.float32)
+            for start in range(0, n_rows, block_rows):
+                stop = min(start + block_rows, n_rows)
+                scores[:, start:stop] = query_vectors @ np.asarray(self._matrix[start:stop]).T
+            return [self._collect_hits(row_scores, k, predicate) for row_scores in scores]
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[Tuple[float, Dict[str, Any], str]]:
+        """Top-k (score, entry, section) hits for a single query"""
+        return self.search_batch([query], k=k, predicate=predicate)[0]
+
+    def _collect_hits(
+        self,
+        row_scores: np.ndarray,
+        k: int,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]]
+    ) -> List[Tuple[float, Dict[str, Any], str]]:
+        """Map the best-scoring rows back to distinct entries"""
+        n_rows = row_scores.shape[0]
+        # Several chunks can map to one entry and the predicate may reject some, so over-fetch
+        n_candidates = min(n_rows, max(k * 8, 64))
+        while True:
+            if n_candidates < n_rows:
+                candidates = np.argpartition(-row_scores, n_candidates - 1)[:n_candidates]
+            else:
+                candidates = np.arange(n_rows)
+            candidates = candidates[np.argsort(-row_scores[candidates], kind='stable')]
+            hits = []
+            seen = set()
+            exhausted = n_candidates >= n_rows
+            for row in candidates:
+                score = float(row_scores[row])
+                if score <= 0.0:
+                    # Remaining rows are unrelated (or free); widening the search cannot help
+                    exhausted = True
+                    break
+                chunk_hash = self._row_hash[row]
+                for key in sorted(self._hash_entries.get(chunk_hash, ())):
+                    if key in seen:
+                        continue
+                    entry = self._entries[key]
+                    if predicate is not None and not predicate(entry):
+                        continue
+                    seen.add(key)
+                    section = next(s for s, h in self._entry_chunks[key] if h == chunk_hash)
+                    hits.append((score, entry, section))
+                if len(hits) >= k:
+                    return hits[:k]
+            if exhausted:
+                return hits
+            n_candidates = min(n_rows, n_candidates * 4)
@@ -0,0 +1,88 @@
+"""Per-entry parse time of the section tokenizer vs. the previous per-section regexes
+
+Usage (from the repository root):
+
+    python benchmarks/bench_parser.py [--sections 200] [--paragraph-words 120] [--repeat 5]
+
+Generates large synthetic logbook entries in a temporary directory and times
+LogbookParser.parse_markdown_entry against a re-implementation of the old
+DOTALL-regex extractors applied to the same content.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import yaml
+
+from logbook_parser import LogbookParser
+
+WORDS = (
+    "sample buffer protein incubated centrifuged measured absorbance plate well "
+    "result observed method notes tags concentration ratio batch control treated "
+    "assay cells growth experiment procedure finding remark outcome signal"
+).split()
+
+HEADINGS = ["Experiment", "Method", "Results", "Observations", "Notes", "Materials", "Next Steps", "Discussion"]
+
+def legacy_parse(file_path):
+    """File read, frontmatter and the extractor regexes used before the single-pass tokenizer"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    parts = content.split('---', 2)
+    yaml.safe_load(parts[1])
+    content = parts[2].strip()
+    re.findall(r'#(\w+)', content)
+    re.findall(r'(?:tags?|keywords?):\s*(.+)', content, re.IGNORECASE)
+    re.findall(r'(?:## |### )?(?:experiment|exp|procedure|method)(?:\s+\d+)?:?\s*(.+?)(?=\n##|\n#|$)',
+               content, re.IGNORECASE | re.DOTALL)
+    re.findall(r'(?:## |### )?(?:results?|findings?|outcome)(?:\s+\d+)?:?\s*(.+?)(?=\n##|\n#|$)',
+               content, re.IGNORECASE | re.DOTALL)
+    re.findall(r'(?:## |### )?(?:observations?|notes?|remarks?)(?:\s+\d+)?:?\s*(.+?)(?=\n##|\n#|$)',
+               content, re.IGNORECASE | re.DOTALL)
+
+def synthetic_entry(rng, n_sections, paragraph_words):
+    lines = ["---", "author: Bench Mark", "date: 2024-06-18", "title: Synthetic entry", "---", "", "# Synthetic entry", ""]
+    for i in range(n_sections):
+        level = "##" if i % 3 == 0 else "###"
+        lines.append(f"{level} {HEADINGS[i % len(HEADINGS)]} {i}")
+        for _ in range(3):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(paragraph_words)))
+            lines.append("")
+    return "\n".join(lines)
+
+def time_per_call(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--sections", type=int, default=200)
+    ap.add_argument("--paragraph-words", type=int, default=120)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    parser = LogbookParser(snapshot_path=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'sections':>8} {'size KB':>8} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for n_sections in (10, args.sections // 4, args.sections):
+            text = synthetic_entry(rng, n_sections, args.paragraph_words)
+            path = os.path.join(tmp, f"2024-06-18-bench-{n_sections}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            before = time_per_call(legacy_parse, path, args.repeat)
+            after = time_per_call(parser.parse_markdown_entry, path, args.repeat)
+            print(f"{n_sections:>8} {len(text) / 1024:>8.0f} {before * 1000:>10.2f} {after * 1000:>10.2f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cold-start time of the API: import, startup and first / and /users responses
+
+Usage (from the repository root):
+
+    python benchmarks/bench_startup.py [--entries 200] [--repeat 3] [--budget 1.5]
+
+Each run starts a fresh interpreter in a temporary working directory with a
+small synthetic logbook tree, imports backend/main.py, runs the app's startup
+and serves GET / and GET /users through Starlette's TestClient. The run fails
+(exit status 1) if the median time to the /users response exceeds --budget
+seconds, or if any LLM code (the agent module, LangChain agents, provider
+SDKs) was loaded to serve those requests.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+# Must stay unloaded until an endpoint actually needs the LLM
+LLM_MODULES = ["langchain_agent", "langchain.agents", "langchain_openai", "openai"]
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started = time.perf_counter()
+    assert client.get("/").status_code == 200
+    root = time.perf_counter()
+    assert client.get("/users").status_code == 200
+    users = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "startup": started - imported,
+    "root": root - start,
+    "users": users - start,
+    "llm_modules": [name for name in %r if name in sys.modules],
+}))
+""" % (LLM_MODULES,)
+
+def make_tree(root, n_entries):
+    for i in range(n_entries):
+        author = f"author_{i % 5}"
+        os.makedirs(os.path.join(root, "logbooks", author), exist_ok=True)
+        with open(os.path.join(root, "logbooks", author, f"2024-06-{i % 28 + 1:02d}-entry-{i}.md"), "w", encoding="utf-8") as f:
+            f.write(f"---\nauthor: {author}\ndate: 2024-06-{i % 28 + 1:02d}\ntitle: Entry {i}\n---\n\n## Results\nValue {i}\n")
+
+def run_once(cwd):
+    env = dict(os.environ, PYTHONPATH=BACKEND, LOGBOOK_WATCH="0", OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "unused"))
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--entries", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--budget", type=float, default=1.5, help="seconds from interpreter start to the /users response")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp, args.entries)
+        # The first run also builds the entry cache under .cache/; later runs start warm like a restarted worker
+        runs = [run_once(tmp) for _ in range(args.repeat)]
+
+    print(f"{'run':>4} {'import s':>9} {'startup s':>10} {'/ s':>7} {'/users s':>9}")
+    for i, run in enumerate(runs):
+        print(f"{i:>4} {run['import']:>9.3f} {run['startup']:>10.3f} {run['root']:>7.3f} {run['users']:>9.3f}")
+    median = statistics.median(run["users"] for run in runs)
+    loaded = sorted({name for run in runs for name in run["llm_modules"]})
+    print(f"median time to /users: {median:.3f}s (budget {args.budget:.3f}s)")
+    if loaded:
+        print(f"FAIL: LLM modules loaded before any LLM request: {', '.join(loaded)}")
+    elif median > args.budget:
+        print("FAIL: over budget")
+    else:
+        print("OK")
+    return 1 if loaded or median > args.budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""EntrySnapshot format v2 round-trip and warm restarts of LogbookParser from it"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from entry_snapshot import EntrySnapshot, SnapshotEntry
+from logbook_entry import LogbookEntry, EXPERIMENT, OBSERVATION
+from logbook_parser import LogbookParser
+
+FIELDS = ("file_path", "author", "date", "title", "tags", "mtime_ns", "size", "body_start", "body_end")
+
+ENTRY_TEMPLATE = """---
+author: {author}
+date: 2024-03-0{day}
+title: Run {day}
+tags: [xrd, {day}]
+---
+
+# Run {day}
+
+## Experiment
+Anneal sample {day}
+
+## Observations
+Peak shift of {day} degrees
+"""
+
+def fields(entry):
+    return [getattr(entry, name) for name in FIELDS] + [entry.section_refs()]
+
+class EntrySnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.logbook_dir = os.path.join(self.tmp.name, "logbooks")
+        self.path = os.path.join(self.tmp.name, "entries.snapshot")
+        self.entries = [
+            LogbookEntry(
+                os.path.join(self.logbook_dir, "ann", "a.md"), "ann", "2024-03-01", "Mixed tags",
+                ["xrd", 7, 2.5, True, date(2024, 3, 1), datetime(2024, 3, 1, 9, 30), ["nested", 1]],
+                1_700_000_000_123_456_789, 512, 40, 512,
+                [(EXPERIMENT, "Anneal", 60, 200), (OBSERVATION, "", 220, 512)]
+            ),
+            # Frontmatter may leave the title out or give a non-string author
+            LogbookEntry(os.path.join(self.logbook_dir, "42", "b.md"), 42, "2024-03-02", None, [], 1, 10, 0, 10, [])
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, logbook_dir=None):
+        snapshot = EntrySnapshot(self.path)
+        return snapshot, snapshot.load(logbook_dir or self.logbook_dir)
+
+    def test_entries_round_trip_with_their_types(self):
+        EntrySnapshot(self.path).write(self.entries, self.logbook_dir, "a" * 40)
+        snapshot, cache = self.load()
+
+        self.assertEqual(snapshot.signature, "a" * 40)
+        self.assertEqual(sorted(cache), sorted(entry.file_path for entry in self.entries))
+        for original in self.entries:
+            cached = cache[original.file_path]
+            self.assertIsInstance(cached["entry"], SnapshotEntry)
+            self.assertEqual((cached["mtime_ns"], cached["size"]), (original.mtime_ns, original.size))
+            self.assertEqual(fields(cached["entry"]), fields(original))
+            self.assertEqual([type(tag) for tag in cached["entry"].tags], [type(tag) for tag in original.tags])
+        self.assertEqual(cache[self.entries[1].file_path]["entry"].author, 42)
+
+    def test_rewriting_loaded_entries_gives_the_same_file(self):
+        EntrySnapshot(self.path).write(self.entries, self.logbook_dir, "a" * 40)
+        with open(self.path, 'rb') as f:
+            first = f.read()
+        _, cache = self.load()
+        EntrySnapshot(self.path).write([cached["entry"] for cached in cache.values()], self.logbook_dir, "a" * 40)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), first)
+
+    def test_truncated_file_is_ignored(self):
+        EntrySnapshot(self.path).write(self.entries, self.logbook_dir, "a" * 40)
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 5)
+        self.assertIsNone(self.load()[1])
+
+    def test_snapshot_of_another_logbook_dir_is_ignored(self):
+        EntrySnapshot(self.path).write(self.entries, self.logbook_dir, "a" * 40)
+        self.assertIsNone(self.load(os.path.join(self.tmp.name, "elsewhere"))[1])
+
+    def test_parser_restarts_from_the_snapshot(self):
+        for day, author in [(1, "ann"), (2, "bob")]:
+            os.makedirs(os.path.join(self.logbook_dir, author), exist_ok=True)
+            with open(os.path.join(self.logbook_dir, author, f"run{day}.md"), 'w', encoding='utf-8') as f:
+                f.write(ENTRY_TEMPLATE.format(author=author, day=day))
+        first = LogbookParser(self.logbook_dir, snapshot_path=self.path, workers=1)
+        parsed = sorted(first.parse_all_logbooks(), key=lambda entry: entry['file_path'])
+        first.flush_snapshot()
+
+        second = LogbookParser(self.logbook_dir, snapshot_path=self.path, workers=1)
+        restored = sorted(second.parse_all_logbooks(), key=lambda entry: entry['file_path'])
+        self.assertTrue(all(isinstance(entry, SnapshotEntry) for entry in restored))
+        self.assertEqual([dict(entry) for entry in restored], [dict(entry) for entry in parsed])
+        self.assertEqual(restored[1]['observations'], ["Peak shift of 2 degrees"])
+        self.assertEqual(second.version, first.version)
+
+if __name__ == "__main__":
+    unittest.main()
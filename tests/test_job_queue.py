@@ -0,0 +1,129 @@
+"""RefinementJobQueue retries, memory use and sharing of jobs_dir between queues"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from job_queue import RefinementJobQueue, JobQueueFull
+
+class FakeAgent:
+    """refine_batch that fails the first ``failures`` attempts at each draft"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.attempts = {}
+
+    def refine_batch(self, drafts):
+        outcomes = []
+        for draft in drafts:
+            attempt = self.attempts.get(draft['title'], 0) + 1
+            self.attempts[draft['title']] = attempt
+            if attempt <= self.failures:
+                outcomes.append(RuntimeError("backend down"))
+            else:
+                outcomes.append(f"# {draft['title']}\n\n{draft['rough_description']}")
+        return outcomes
+
+class FakeParser:
+    def __init__(self):
+        self.saved = []
+
+    def save_entry(self, author, title, content, tags):
+        self.saved.append(title)
+        return f"logbooks/{author}/{title}.md"
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+class RefinementJobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.jobs_dir = os.path.join(self.tmp.name, "jobs")
+        self.queues = []
+
+    def tearDown(self):
+        for jobs in self.queues:
+            jobs.stop()
+        self.tmp.cleanup()
+
+    def make_queue(self, agent=None, parser=None, **kwargs) -> RefinementJobQueue:
+        agent = agent or FakeAgent()
+        jobs = RefinementJobQueue(lambda: agent, parser or FakeParser(), jobs_dir=self.jobs_dir, **kwargs)
+        self.queues.append(jobs)
+        return jobs
+
+    def test_failed_attempts_are_retried_until_done(self):
+        jobs = self.make_queue(FakeAgent(failures=2), retry_delay=0.01)
+        jobs.start()
+        job = jobs.submit("ann", "flaky", "rough notes", [])
+        self.assertTrue(wait_for(lambda: jobs.get(job['id'])['status'] == "done"))
+        finished = jobs.get(job['id'])
+        self.assertEqual(finished['attempts'], 3)
+        self.assertEqual(finished['file_path'], "logbooks/ann/flaky.md")
+
+    def test_job_fails_after_max_attempts(self):
+        jobs = self.make_queue(FakeAgent(failures=5), retry_delay=0.01, max_attempts=2)
+        jobs.start()
+        job = jobs.submit("ann", "broken", "rough notes", [])
+        self.assertTrue(wait_for(lambda: jobs.get(job['id'])['status'] == "failed"))
+        self.assertEqual(jobs.get(job['id'])['error'], "backend down")
+
+    def test_finished_jobs_leave_memory_but_stay_readable(self):
+        jobs = self.make_queue()
+        jobs.start()
+        job = jobs.submit("ann", "quick", "rough notes", [])
+        self.assertTrue(wait_for(lambda: jobs.get(job['id'])['status'] == "done"))
+        self.assertTrue(wait_for(lambda: not jobs._jobs))
+        self.assertEqual(jobs.get(job['id'])['refined_content'], "# quick\n\nrough notes")
+        self.assertEqual(jobs.stats()['done'], 1)
+
+    def test_submit_rejects_beyond_max_pending(self):
+        jobs = self.make_queue(max_pending=2)
+        # Not started: submitted jobs stay pending
+        jobs.submit("ann", "one", "rough", [])
+        jobs.submit("ann", "two", "rough", [])
+        with self.assertRaises(JobQueueFull):
+            jobs.submit("ann", "three", "rough", [])
+
+    def test_jobs_of_a_live_owner_are_not_taken_over(self):
+        owner = self.make_queue()
+        owner._hold_owner_lock()
+        job = owner.submit("ann", "owned", "rough", [])
+
+        other_parser = FakeParser()
+        other = self.make_queue(parser=other_parser)
+        other.start()
+        time.sleep(0.2)
+        self.assertEqual(other_parser.saved, [])
+        # Still readable from the other queue through the job file
+        self.assertEqual(other.get(job['id'])['status'], "pending")
+
+    def test_orphaned_jobs_are_taken_over_exactly_once(self):
+        owner = self.make_queue()
+        owner._hold_owner_lock()
+        job = owner.submit("ann", "orphan", "rough", [])
+        # The owner's process dies: the OS releases its lock but leaves the file
+        owner._owner_lock.close()
+        owner._owner_lock = None
+
+        parsers = [FakeParser(), FakeParser()]
+        successors = [self.make_queue(parser=parser) for parser in parsers]
+        threads = [threading.Thread(target=successor.start) for successor in successors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertTrue(wait_for(lambda: successors[0].get(job['id'])['status'] == "done"))
+        self.assertEqual(sum(len(parser.saved) for parser in parsers), 1)
+
+if __name__ == "__main__":
+    unittest.main()
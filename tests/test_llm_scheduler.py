@@ -0,0 +1,103 @@
+"""LLMScheduler priority ordering, overload rejection (429) and queue timeouts (503)"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from llm_scheduler import LLMScheduler, Priority, SchedulerRejected
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+class LLMSchedulerTest(unittest.TestCase):
+    def test_queued_requests_are_served_by_priority_then_arrival(self):
+        scheduler = LLMScheduler(limits={"local": 1})
+        order = []
+
+        def request(name, priority):
+            with scheduler.slot("local", priority):
+                order.append(name)
+
+        threads = []
+        with scheduler.slot("local", Priority.INTERACTIVE):
+            for name, priority in [
+                ("summary", Priority.SUMMARY),
+                ("refine-1", Priority.REFINE),
+                ("query", Priority.INTERACTIVE),
+                ("refine-2", Priority.REFINE)
+            ]:
+                thread = threading.Thread(target=request, args=(name, priority))
+                thread.start()
+                threads.append(thread)
+                # Enqueue in a known order
+                self.assertTrue(wait_for(lambda: scheduler.stats()["local"]["queued"] == len(threads)))
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, ["query", "refine-1", "refine-2", "summary"])
+        stats = scheduler.stats()["local"]
+        self.assertEqual((stats["active"], stats["queued"], stats["admitted"]), (0, 0, 5))
+
+    def test_full_queue_is_rejected_with_429(self):
+        scheduler = LLMScheduler(limits={"local": 1}, max_queue=1, max_wait=5)
+        def queued():
+            with scheduler.slot("local", Priority.REFINE):
+                pass
+
+        with scheduler.slot("local", Priority.REFINE):
+            waiter = threading.Thread(target=queued)
+            waiter.start()
+            self.assertTrue(wait_for(lambda: scheduler.stats()["local"]["queued"] == 1))
+            with self.assertRaises(SchedulerRejected) as raised:
+                with scheduler.slot("local", Priority.INTERACTIVE):
+                    pass
+            self.assertEqual(raised.exception.status_code, 429)
+        waiter.join(5)
+        self.assertEqual(scheduler.stats()["local"]["rejected"], 1)
+
+    def test_wait_beyond_max_wait_is_rejected_with_503_and_frees_its_place(self):
+        scheduler = LLMScheduler(limits={"local": 1}, max_wait=0.05)
+        with scheduler.slot("local", Priority.REFINE):
+            with self.assertRaises(SchedulerRejected) as raised:
+                with scheduler.slot("local", Priority.SUMMARY):
+                    pass
+            self.assertEqual(raised.exception.status_code, 503)
+        stats = scheduler.stats()["local"]
+        self.assertEqual((stats["active"], stats["queued"], stats["timed_out"]), (0, 0, 1))
+        # The backend is usable again straight away
+        with scheduler.slot("local", Priority.SUMMARY):
+            self.assertEqual(scheduler.stats()["local"]["active"], 1)
+
+    def test_cancelled_async_waiter_gives_up_its_place(self):
+        async def scenario():
+            scheduler = LLMScheduler(limits={"local": 1})
+            served = []
+
+            async def request(name, priority):
+                async with scheduler.aslot("local", priority):
+                    served.append(name)
+
+            async with scheduler.aslot("local", Priority.REFINE):
+                cancelled = asyncio.create_task(request("cancelled", Priority.INTERACTIVE))
+                kept = asyncio.create_task(request("kept", Priority.SUMMARY))
+                await asyncio.sleep(0.01)
+                cancelled.cancel()
+                await asyncio.gather(cancelled, return_exceptions=True)
+            await asyncio.wait_for(kept, 5)
+            return served, scheduler.stats()["local"]
+
+        served, stats = asyncio.run(scenario())
+        self.assertEqual(served, ["kept"])
+        self.assertEqual((stats["active"], stats["queued"]), (0, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""SingleFlight coalescing, error sharing and leader cancellation"""
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from single_flight import SingleFlight
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_threads_share_one_call(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        while flight.stats()["deduplicated"] < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {"executed": 1, "deduplicated": 3, "in_flight": 0})
+
+    def test_exception_is_shared_with_followers(self):
+        async def scenario():
+            flight = SingleFlight()
+            release = asyncio.Event()
+
+            async def fail():
+                await release.wait()
+                raise ValueError("backend down")
+
+            tasks = [asyncio.create_task(flight.ado("k", fail)) for _ in range(3)]
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(*tasks, return_exceptions=True), flight.stats()
+
+        outcomes, stats = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+        self.assertEqual(stats["executed"], 1)
+
+    def test_cancelled_leader_hands_the_call_to_a_follower(self):
+        async def scenario():
+            flight = SingleFlight()
+            calls = []
+
+            async def work():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return "result"
+
+            leader = asyncio.create_task(flight.ado("k", work))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.ado("k", work))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await follower, len(calls), flight.stats()
+
+        result, n_calls, stats = asyncio.run(scenario())
+        self.assertEqual(result, "result")
+        self.assertEqual(n_calls, 2)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_cancelled_follower_leaves_the_call_running(self):
+        async def scenario():
+            flight = SingleFlight()
+
+            async def work():
+                await asyncio.sleep(0.05)
+                return "result"
+
+            leader = asyncio.create_task(flight.ado("k", work))
+            await asyncio.sleep(0)
+            cancelled = asyncio.create_task(flight.ado("k", work))
+            other = asyncio.create_task(flight.ado("k", work))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            return await asyncio.gather(leader, other, cancelled, return_exceptions=True)
+
+        leader, other, cancelled = asyncio.run(scenario())
+        self.assertEqual((leader, other), ("result", "result"))
+        self.assertIsInstance(cancelled, asyncio.CancelledError)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""VectorIndex store sharing between indexes (uvicorn workers) on one directory
+
+Run from the repository root:
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from vector_index import VectorIndex, HashingEmbedder
+
+def make_entry(name: str, text: str) -> dict:
+    return {
+        "file_path": f"logbooks/{name}.md",
+        "title": name,
+        "content": text,
+        "experiments": [],
+        "results": [],
+        "observations": []
+    }
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+class VectorIndexStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.tmp.name, "vectors")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_two_indexes_on_one_directory_keep_their_own_vectors(self):
+        first = VectorIndex(self.store_dir, embedder=HashingEmbedder(dim=64))
+        second = VectorIndex(self.store_dir, embedder=HashingEmbedder(dim=64))
+        try:
+            first.sync([make_entry("spectra", "absorbance spectra of the protein sample")])
+            second.sync([make_entry("cells", "cell growth in the treated culture")])
+            # Churn in one index (freeing and reusing rows) must not touch the other's rows
+            first.sync([make_entry("buffer", "buffer preparation and pH calibration")])
+
+            hits = second.search("cell growth culture")
+            self.assertEqual([entry["file_path"] for _, entry, _ in hits], ["logbooks/cells.md"])
+            self.assertGreater(hits[0][0], 0.5)
+            hits = first.search("buffer pH calibration")
+            self.assertEqual([entry["file_path"] for _, entry, _ in hits], ["logbooks/buffer.md"])
+            self.assertGreater(hits[0][0], 0.5)
+        finally:
+            first.close()
+            second.close()
+
+    def test_released_slot_is_reused_with_its_vectors(self):
+        embedder = CountingEmbedder()
+        entries = [make_entry("spectra", "absorbance spectra of the protein sample")]
+        first = VectorIndex(self.store_dir, embedder=embedder)
+        first.sync(entries)
+        first.close()
+        self.assertEqual(embedder.embedded, 1)
+
+        reopened = VectorIndex(self.store_dir, embedder=embedder)
+        try:
+            reopened.sync(entries)
+            self.assertEqual(embedder.embedded, 1)
+            self.assertEqual(len(reopened.search("absorbance spectra")), 1)
+        finally:
+            reopened.close()
+
+if __name__ == "__main__":
+    unittest.main()